@@ -0,0 +1,102 @@
+import argparse
+import time
+from typing import Callable, Iterable, List
+
+from graphrag_neo4j.constants.moby_dick_text import MOBY_DICK_TEXT
+from graphrag_neo4j.ingestion import iter_chunk_text_whitespace_split
+
+
+# chunk_text_whitespace_split as it was before the single-pass rewrite; its
+# chunks must match the new ones and it sets the speed baseline
+def legacy_chunk_text_whitespace_split(
+    text: str, chunk_size: int, overlap: int
+) -> List[str]:
+    chunks = []
+    index = 0
+
+    while len(text) > index:
+        prev_whitespace = 0
+        left_index = index - overlap
+        while left_index >= 0:
+            if text[left_index] == " ":
+                prev_whitespace = left_index
+                break
+            left_index -= 1
+        next_whitespace = text.find(" ", index + chunk_size)
+        if next_whitespace == -1:
+            next_whitespace = len(text)
+        chunk = text[prev_whitespace:next_whitespace].strip()
+        chunks.append(chunk)
+        index = next_whitespace + 1
+    return chunks
+
+
+def synthetic_text(megabytes: int) -> str:
+    repeats = megabytes * 1024 * 1024 // len(MOBY_DICK_TEXT) + 1
+    return (MOBY_DICK_TEXT * repeats)[: megabytes * 1024 * 1024]
+
+
+def run(
+    name: str,
+    chunker: Callable[[str, int, int], Iterable[str]],
+    text: str,
+    chunk_size: int,
+    overlap: int,
+) -> int:
+    start = time.perf_counter()
+    count = sum(1 for _ in chunker(text, chunk_size, overlap))
+    seconds = time.perf_counter() - start
+    print(
+        f"  {name:<10} {seconds:8.3f}s {len(text) / seconds / 1e6:8.1f} MB/s "
+        f"{count} chunks"
+    )
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Whitespace chunker: legacy list-building vs streaming."
+    )
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--overlap", type=int, default=64)
+    parser.add_argument("--synthetic-mb", type=int, default=1024)
+    parser.add_argument(
+        "--legacy-max-mb",
+        type=int,
+        default=64,
+        help="skip the legacy chunker on larger inputs, it keeps every chunk in memory",
+    )
+    args = parser.parse_args()
+
+    corpora = {
+        "MOBY_DICK_TEXT": MOBY_DICK_TEXT,
+        f"synthetic {args.synthetic_mb}MB": synthetic_text(args.synthetic_mb),
+        # long runs without spaces are the worst case for the backward scan
+        "no-space runs 8MB": ("x" * 4096 + " ") * (8 * 256),
+    }
+    for name, text in corpora.items():
+        print(name)
+        run(
+            "streaming",
+            iter_chunk_text_whitespace_split,
+            text,
+            args.chunk_size,
+            args.overlap,
+        )
+        if len(text) <= args.legacy_max_mb * 1024 * 1024:
+            run(
+                "legacy",
+                legacy_chunk_text_whitespace_split,
+                text,
+                args.chunk_size,
+                args.overlap,
+            )
+            assert legacy_chunk_text_whitespace_split(
+                text, args.chunk_size, args.overlap
+            ) == list(
+                iter_chunk_text_whitespace_split(text, args.chunk_size, args.overlap)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers")
+LIGHT_MODULES = (
+    "graphrag_neo4j.ingestion",
+    "graphrag_neo4j.store",
+    "graphrag_neo4j.search",
+)
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+heavy = sorted(
+    name for name in sys.modules if name.split(".")[0] in {heavy!r}
+)
+print(json.dumps({{
+    "seconds": seconds,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy": heavy,
+}}))
+"""
+
+
+def probe(module: str) -> dict:
+    # a fresh interpreter per module, so nothing is already cached in sys.modules
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Import time of the core modules; fails if any pulls in torch."
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    failures = []
+    for module in LIGHT_MODULES:
+        runs = [probe(module) for _ in range(args.repeat)]
+        seconds = min(run["seconds"] for run in runs)
+        heavy = sorted({name for run in runs for name in run["heavy"]})
+        print(
+            f"{module:<28} {seconds * 1000:8.1f}ms "
+            f"rss {runs[0]['max_rss_mb']:7.1f}MB "
+            f"heavy modules: {', '.join(heavy) or 'none'}"
+        )
+        if heavy:
+            failures.append(f"{module} imports {', '.join(heavy)}")
+        if args.max_seconds is not None and seconds > args.max_seconds:
+            failures.append(f"{module} took {seconds:.2f}s > {args.max_seconds}s")
+
+    if failures:
+        print("\n".join(failures), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+from neo4j import Driver, GraphDatabase
+
+from graphrag_neo4j.schema import UniquenessConstraint, apply_constraints
+
+load_dotenv()
+
+URI = os.getenv("URI", "neo4j://localhost:7687")
+USER = os.getenv("USER", "neo4j")
+PASSWORD = os.getenv("PASSWORD", "password")
+AUTH = (USER, PASSWORD)
+
+# a label of its own, so the benchmark never touches ingested data
+BENCH_CONSTRAINT = UniquenessConstraint("bench_merge_id", "BenchMerge", "id")
+
+
+def reset(driver: Driver):
+    driver.execute_query(f"DROP CONSTRAINT {BENCH_CONSTRAINT.name} IF EXISTS")
+    # CALL ... IN TRANSACTIONS needs an implicit transaction, not execute_query
+    with driver.session() as session:
+        session.run(
+            """
+                MATCH (n:BenchMerge)
+                CALL (n) { DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS
+            """
+        ).consume()
+
+
+def merge_batches(driver: Driver, nodes: int, batch_size: int, report_every: int):
+    for start in range(0, nodes, batch_size):
+        ids = [f"node_{i}" for i in range(start, start + batch_size)]
+        began = time.perf_counter()
+        driver.execute_query(
+            """
+                UNWIND $ids AS id
+                MERGE (n:BenchMerge {id: id})
+                SET n.text = id
+            """,
+            ids=ids,
+        )
+        seconds = time.perf_counter() - began
+        if start % report_every == 0:
+            print(
+                f"  {start:>9} existing nodes "
+                f"{seconds / batch_size * 1e6:9.1f}us per MERGE"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="MERGE cost as the node count grows, with and without a constraint."
+    )
+    parser.add_argument("--nodes", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--report-every", type=int, default=10_000)
+    args = parser.parse_args()
+
+    with GraphDatabase.driver(URI, auth=AUTH) as driver:
+        for constrained in (False, True):
+            reset(driver)
+            if constrained:
+                apply_constraints(driver, [BENCH_CONSTRAINT])
+            print("with uniqueness constraint" if constrained else "label scan")
+            merge_batches(driver, args.nodes, args.batch_size, args.report_every)
+        reset(driver)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import os
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from graphrag_neo4j.constants.moby_dick_text import MOBY_DICK_TEXT
+from graphrag_neo4j.embedder import Embedder, EmbeddingService
+from graphrag_neo4j.ingestion import chunk_text
+from graphrag_neo4j.onnx_embedder import OnnxEmbedder, cosine_similarities
+
+load_dotenv()
+
+EMBED_MODEL = os.getenv("EMBED_MODEL", "")
+CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "")
+ONNX_EXPORT_DIR = os.getenv("ONNX_EXPORT_DIR", "onnx_export")
+
+QUESTIONS = [
+    "captain",
+    "Who is Ishmael?",
+    "the white whale",
+    "what happened to the Pequod",
+    "harpoon",
+]
+
+
+def measure(embedder: Embedder, chunks: list[str], queries: int, batch_size: int):
+    embedder.encode(QUESTIONS)
+
+    latencies = []
+    for i in range(queries):
+        start = time.perf_counter()
+        embedder.encode(QUESTIONS[i % len(QUESTIONS)])
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    embeddings = np.asarray(embedder.encode(chunks, batch_size=batch_size))
+    seconds = time.perf_counter() - start
+    return np.array(latencies) * 1000, len(chunks) / seconds, embeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Latency and throughput of ONNX Runtime vs PyTorch on CPU."
+    )
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--quantization", default="avx512_vnni")
+    args = parser.parse_args()
+
+    chunks = chunk_text(MOBY_DICK_TEXT, 512, 64)[: args.chunks]
+    embedders: dict[str, Embedder] = {
+        "pytorch": EmbeddingService(EMBED_MODEL, cache_dir=CACHE_DIR, use_cuda=False),
+        "onnx": OnnxEmbedder(
+            EMBED_MODEL, cache_dir=CACHE_DIR, export_dir=ONNX_EXPORT_DIR
+        ),
+        "onnx-int8": OnnxEmbedder(
+            EMBED_MODEL,
+            cache_dir=CACHE_DIR,
+            export_dir=ONNX_EXPORT_DIR,
+            quantization=args.quantization,
+        ),
+    }
+
+    reference = None
+    for name, embedder in embedders.items():
+        latencies, throughput, embeddings = measure(
+            embedder, chunks, args.queries, args.batch_size
+        )
+        if reference is None:
+            reference = embeddings
+        min_cosine = cosine_similarities(reference, embeddings).min()
+        print(
+            f"{name:<10} p50 {np.percentile(latencies, 50):7.2f}ms "
+            f"p95 {np.percentile(latencies, 95):7.2f}ms "
+            f"{throughput:8.1f} chunks/s min cosine vs pytorch {min_cosine:.5f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import re
+import time
+from typing import Callable, List
+
+from graphrag_neo4j.constants.moby_dick_text import MOBY_DICK_TEXT
+from graphrag_neo4j.ingestion import split_text_to_section_by_titles
+from graphrag_neo4j.store import Section
+
+
+# the DOTALL regex splitter that was replaced; it defines the expected
+# sections, but its lazy title match is quadratic on unterminated headings
+def legacy_split_text_to_section_by_titles(text: str) -> List[Section]:
+    title_pattern = re.compile(
+        r"^(CHAPTER\s+\d+\.\s+.+?[.!?]|Epilogue|Prologue)$", re.DOTALL | re.MULTILINE
+    )
+
+    titles = [title.strip().lower() for title in title_pattern.findall(text)]
+    sections = list(
+        filter(lambda text: bool(text.strip()), re.split(title_pattern, text))
+    )
+
+    return [
+        Section(id=title, text=title + sections[1 + i * 2])
+        for i, title in enumerate(titles)
+    ]
+
+
+# headings whose title is not on the CHAPTER line, which the line-based splitter
+# has to find the same way the legacy regex does
+SPLIT_HEADINGS = [
+    "CHAPTER 3.\nTitle on next line.\nbag.\n",
+    "CHAPTER 3.\n\nTitle.\nbody\n",
+    "CHAPTER 1. Loomings.\nbody\nCHAPTER 2.\nThe Carpet-Bag!\nbody\n",
+    "CHAPTER 1. Loomings.\nbody\nCHAPTER 2. \n\nThe Carpet-Bag?\nbody\nEpilogue\nthe end\n",
+]
+
+
+def unterminated_headings(lines: int) -> str:
+    # every heading lacks a terminator and no later line ends in [.!?], so the
+    # lazy DOTALL match scans to the end of the text for each heading
+    return "".join(
+        f"CHAPTER {i}. a heading without an end\nand a body line without one\n"
+        for i in range(lines // 2)
+    )
+
+
+def heading_then_prose(lines: int) -> str:
+    # one unterminated heading followed by prose whose lines never end a sentence
+    return "CHAPTER 1. Loomings\n" + "call me ishmael, some years ago\n" * lines
+
+
+def time_split(splitter: Callable[[str], List[Section]], text: str) -> float:
+    start = time.perf_counter()
+    splitter(text)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Section splitting: legacy regex vs single finditer pass."
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 2000, 4000, 1_000_000]
+    )
+    parser.add_argument(
+        "--legacy-max-lines",
+        type=int,
+        default=4000,
+        help="skip the legacy splitter above this size, it is quadratic here",
+    )
+    args = parser.parse_args()
+
+    for text in [MOBY_DICK_TEXT, *SPLIT_HEADINGS]:
+        assert legacy_split_text_to_section_by_titles(
+            text
+        ) == split_text_to_section_by_titles(text), text[:80]
+    single_pass = time_split(split_text_to_section_by_titles, MOBY_DICK_TEXT)
+    legacy = time_split(legacy_split_text_to_section_by_titles, MOBY_DICK_TEXT)
+    print(f"MOBY_DICK_TEXT single pass {single_pass:.4f}s legacy {legacy:.4f}s")
+
+    for name, generate in {
+        "unterminated headings": unterminated_headings,
+        "heading then prose": heading_then_prose,
+    }.items():
+        print(name)
+        for lines in args.sizes:
+            text = generate(lines)
+            single_pass = time_split(split_text_to_section_by_titles, text)
+            legacy = "skipped"
+            if lines <= args.legacy_max_lines:
+                seconds = time_split(legacy_split_text_to_section_by_titles, text)
+                legacy = f"{seconds:.4f}s"
+            print(f"  {lines:>8} lines single pass {single_pass:.4f}s legacy {legacy}")
+
+
+if __name__ == "__main__":
+    main()
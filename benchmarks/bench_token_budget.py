@@ -0,0 +1,68 @@
+import argparse
+import os
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from graphrag_neo4j.constants.moby_dick_text import MOBY_DICK_TEXT
+from graphrag_neo4j.embedder import EmbeddingService
+from graphrag_neo4j.ingestion import chunk_text
+
+load_dotenv()
+
+EMBED_MODEL = os.getenv("EMBED_MODEL", "")
+CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "")
+
+
+def time_encode(embedder: EmbeddingService, chunks: list[str], **kwargs):
+    start = time.perf_counter()
+    embeddings = embedder.encode(chunks, **kwargs)
+    return time.perf_counter() - start, np.asarray(embeddings)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Fixed-size vs token-budget batching on the Moby Dick corpus (CPU)."
+    )
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--overlap", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument(
+        "--token-budgets", type=int, nargs="+", default=[4096, 8192, 16384]
+    )
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    embedder = EmbeddingService(EMBED_MODEL, cache_dir=CACHE_DIR, use_cuda=False)
+    chunks = chunk_text(MOBY_DICK_TEXT, args.chunk_size, args.overlap)[: args.limit]
+    lengths = embedder.token_lengths(chunks)
+    print(
+        f"{len(chunks)} chunks, tokens min/median/max = "
+        f"{min(lengths)}/{int(np.median(lengths))}/{max(lengths)}"
+    )
+
+    # warm up so the first configuration does not pay for kernel initialisation
+    embedder.encode(chunks[: args.batch_size], batch_size=args.batch_size)
+
+    baseline_seconds, baseline = time_encode(
+        embedder, chunks, batch_size=args.batch_size
+    )
+    print(
+        f"batch_size={args.batch_size:<6} {baseline_seconds:8.2f}s "
+        f"{len(chunks) / baseline_seconds:8.1f} chunks/s"
+    )
+    for token_budget in args.token_budgets:
+        seconds, embeddings = time_encode(
+            embedder, chunks, batch_size=args.batch_size, token_budget=token_budget
+        )
+        max_error = float(np.abs(embeddings - baseline).max())
+        print(
+            f"token_budget={token_budget:<6} {seconds:8.2f}s "
+            f"{len(chunks) / seconds:8.1f} chunks/s "
+            f"speedup x{baseline_seconds / seconds:.2f} max|diff|={max_error:.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import argparse
+import os
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from neo4j import Driver, GraphDatabase
+
+# driver internals, used only to count the exact bytes a parameter packs to
+from neo4j._codec.packstream import Structure
+from neo4j._codec.packstream.v1 import PackableBuffer, Packer
+
+from graphrag_neo4j.vectors import Vector, set_embedding, vector_values
+
+load_dotenv()
+
+URI = os.getenv("URI", "neo4j://localhost:7687")
+USER = os.getenv("USER", "neo4j")
+PASSWORD = os.getenv("PASSWORD", "password")
+AUTH = (USER, PASSWORD)
+
+FLOAT32_MARKER = b"\xc6"
+
+
+def legacy_values(embeddings: np.ndarray) -> list:
+    # what store_document used to send: one numpy row per vector
+    return list(embeddings)
+
+
+def packed_bytes(value) -> int:
+    buffer = PackableBuffer()
+    packer = Packer(buffer)
+    if Vector is not None and value and isinstance(value[0], Vector):
+        # the same structure the Bolt 6 dehydration hook writes for a vector
+        value = [Structure(b"V", FLOAT32_MARKER, vector.raw()) for vector in value]
+    packer.pack(value)
+    return len(buffer.data)
+
+
+def encodings(native: bool) -> dict:
+    modes = {
+        "float64 list": (legacy_values, "SET n.embedding = embedding"),
+        "float32 procedure": (
+            lambda embeddings: vector_values(embeddings),
+            set_embedding("n", "embedding"),
+        ),
+    }
+    if native:
+        modes["native float32"] = (
+            lambda embeddings: vector_values(embeddings, native=True),
+            set_embedding("n", "embedding", native=True),
+        )
+    return modes
+
+
+def measure_payloads(embeddings: np.ndarray, native: bool):
+    for name, (encode, _) in encodings(native).items():
+        start = time.perf_counter()
+        value = encode(embeddings)
+        encode_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        size = packed_bytes(value)
+        pack_seconds = time.perf_counter() - start
+        print(
+            f"  {name:<18} {size / len(embeddings):8.0f} bytes per vector "
+            f"encode {encode_seconds:.4f}s pack {pack_seconds:.4f}s"
+        )
+
+
+def reset(driver: Driver):
+    with driver.session() as session:
+        session.run(
+            """
+                MATCH (n:BenchVector)
+                CALL (n) { DELETE n } IN TRANSACTIONS OF 10000 ROWS
+            """
+        ).consume()
+
+
+def measure_ingestion(
+    driver: Driver, embeddings: np.ndarray, batch_size: int, native: bool
+):
+    for name, (encode, set_clause) in encodings(native).items():
+        reset(driver)
+        query = f"""
+            UNWIND $embeddings AS embedding
+            CREATE (n:BenchVector)
+            WITH n, embedding
+            {set_clause}
+        """
+        start = time.perf_counter()
+        for offset in range(0, len(embeddings), batch_size):
+            driver.execute_query(
+                query, embeddings=encode(embeddings[offset : offset + batch_size])
+            )
+        seconds = time.perf_counter() - start
+        print(f"  {name:<18} {len(embeddings) / seconds:10.0f} vectors/s")
+    reset(driver)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Payload size and write speed of float64 lists vs float32 vectors."
+    )
+    parser.add_argument("--vectors", type=int, default=10_000)
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument(
+        "--native",
+        action="store_true",
+        help="include the native vector type (neo4j driver 6, Neo4j 2025.10+)",
+    )
+    parser.add_argument(
+        "--ingest", action="store_true", help="also write the vectors to Neo4j"
+    )
+    args = parser.parse_args()
+
+    if args.native and Vector is None:
+        parser.error("--native needs the neo4j driver 6.0 or later")
+    embeddings = (
+        np.random.default_rng(0)
+        .standard_normal((args.vectors, args.dimensions))
+        .astype(np.float32)
+    )
+
+    print(f"payload for {args.vectors} vectors of {args.dimensions} dimensions")
+    measure_payloads(embeddings, args.native)
+    if args.ingest:
+        print(f"ingestion in transactions of {args.batch_size} vectors")
+        with GraphDatabase.driver(URI, auth=AUTH) as driver:
+            measure_ingestion(driver, embeddings, args.batch_size, args.native)
+
+
+if __name__ == "__main__":
+    main()
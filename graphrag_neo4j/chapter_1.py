@@ -4,11 +4,13 @@ from dotenv import load_dotenv
 from neo4j import Driver, EagerResult, GraphDatabase
 
 from graphrag_neo4j.constants.bee_movie_script import BEE_MOVIE_SCRIPT
-from graphrag_neo4j.db_setup import create_text_index, create_vector_index
+from graphrag_neo4j.db_setup import CHUNK_INDEXES, VectorIndexConfig, bulk_load
 from graphrag_neo4j.embedder import Embedder, EmbeddingService
+from graphrag_neo4j.embedding_cache import EmbeddingCache
 from graphrag_neo4j.ingestion import chunk_text
-from search import hybrid_search, text_search, vector_search
-from store import Document, store_node
+from graphrag_neo4j.schema import apply_constraints
+from graphrag_neo4j.search import hybrid_search, text_search, vector_search
+from graphrag_neo4j.store import store_chunks
 
 load_dotenv()
 
@@ -19,11 +21,15 @@ PASSWORD = os.getenv("PASSWORD", "password")
 AUTH = (USER, PASSWORD)
 EMBED_MODEL = os.getenv("EMBED_MODEL", "")
 CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "")
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")
 
 
 def store_text(driver: Driver, embedder: Embedder, text: str):
-    chunks = chunk_text(text, 512, 64, False)
-    store_node(driver, Document(text=chunks, embeddings=embedder.encode(chunks)))
+    store_chunks(driver, embedder, chunk_text(text, 512, 64, False))
+
+
+def print_index_progress(name: str, state: str, percent: float):
+    print(f"index {name}: {state} {percent:.1f}%")
 
 
 def print_single_method_search_results(similar_results: EagerResult):
@@ -44,11 +50,24 @@ def print_hybrid_search_results(similar_hybrid_results: EagerResult):
 
 def main():
     with GraphDatabase.driver(URI, auth=AUTH) as driver:
-        embedder = EmbeddingService(EMBED_MODEL, cache_dir=CACHE_DIR)
-
-        create_vector_index(driver)
-        create_text_index(driver)
-        store_text(driver, embedder, BEE_MOVIE_SCRIPT)
+        embedder = EmbeddingService(
+            EMBED_MODEL,
+            cache_dir=CACHE_DIR,
+            embedding_cache=(
+                EmbeddingCache(EMBEDDING_CACHE_PATH) if EMBEDDING_CACHE_PATH else None
+            ),
+            warm_up=True,
+        )
+
+        apply_constraints(driver)
+        # the indexes are built once the text is stored, not on every write
+        with bulk_load(
+            driver,
+            CHUNK_INDEXES,
+            VectorIndexConfig.from_embedder(embedder),
+            on_progress=print_index_progress,
+        ):
+            store_text(driver, embedder, BEE_MOVIE_SCRIPT)
 
         text_search_results = text_search(driver, "according to all")
         print_single_method_search_results(text_search_results)
@@ -3,12 +3,14 @@ import os
 from dotenv import load_dotenv
 from neo4j import Driver, EagerResult, GraphDatabase
 
-from graphrag_neo4j.db_setup import create_graph_vector_index
+from graphrag_neo4j.db_setup import DOCUMENT_INDEXES, VectorIndexConfig, bulk_load
 from graphrag_neo4j.embedder import Embedder, EmbeddingService
+from graphrag_neo4j.embedding_cache import EmbeddingCache
 from graphrag_neo4j.ingestion import split_text_to_section_by_titles
 from graphrag_neo4j.constants.moby_dick_text import MOBY_DICK_TEXT
-from search import graph_vector_search
-from store import store_document
+from graphrag_neo4j.schema import apply_constraints
+from graphrag_neo4j.search import graph_vector_search
+from graphrag_neo4j.store import store_document
 
 load_dotenv()
 
@@ -19,6 +21,7 @@ PASSWORD = os.getenv("PASSWORD", "password")
 AUTH = (USER, PASSWORD)
 EMBED_MODEL = os.getenv("EMBED_MODEL", "")
 CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "")
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")
 
 
 def store_text(driver: Driver, embedder: Embedder, text: str, pdf_id: str):
@@ -26,6 +29,10 @@ def store_text(driver: Driver, embedder: Embedder, text: str, pdf_id: str):
     store_document(driver, embedder, pdf_id, sections)
 
 
+def print_index_progress(name: str, state: str, percent: float):
+    print(f"index {name}: {state} {percent:.1f}%")
+
+
 def print_graph_search_results(similar_graph_results: EagerResult):
     for record in similar_graph_results.records:
         print("text: \n" + record["text"])
@@ -35,9 +42,23 @@ def print_graph_search_results(similar_graph_results: EagerResult):
 
 def main():
     with GraphDatabase.driver(URI, auth=AUTH) as driver:
-        embedder = EmbeddingService(EMBED_MODEL, cache_dir=CACHE_DIR)
-        create_graph_vector_index(driver)
-        store_text(driver, embedder, MOBY_DICK_TEXT, "moby_dick")
+        embedder = EmbeddingService(
+            EMBED_MODEL,
+            cache_dir=CACHE_DIR,
+            embedding_cache=(
+                EmbeddingCache(EMBEDDING_CACHE_PATH) if EMBEDDING_CACHE_PATH else None
+            ),
+            warm_up=True,
+        )
+        apply_constraints(driver)
+        # the index is built once the text is stored, not on every write
+        with bulk_load(
+            driver,
+            DOCUMENT_INDEXES,
+            VectorIndexConfig.from_embedder(embedder),
+            on_progress=print_index_progress,
+        ):
+            store_text(driver, embedder, MOBY_DICK_TEXT, "moby_dick")
         graph_vector_search_results = graph_vector_search(
             driver, embedder, "parent", "captain", 4
         )
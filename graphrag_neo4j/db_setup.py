@@ -1,27 +1,168 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Literal, Tuple
+
 from neo4j import Driver
 
+from graphrag_neo4j.schema import wait_for_indexes_online
 
-def create_vector_index(driver: Driver):
-    driver.execute_query(
-        """
-            CREATE VECTOR INDEX pdf IF NOT EXISTS
-            FOR (c:Chunk)
-            ON c.embedding
-        """
-    )
+if TYPE_CHECKING:
+    from graphrag_neo4j.embedder import Embedder
+
+
+SIMILARITY_FUNCTIONS = ("cosine", "euclidean")
+
+
+@dataclass(frozen=True)
+class VectorIndexConfig:
+    # None leaves a setting at the server default; m and ef_construction trade
+    # build time and memory for recall, quantization trades recall for memory
+    dimensions: int | None = None
+    similarity_function: Literal["cosine", "euclidean"] = "cosine"
+    hnsw_m: int | None = None
+    hnsw_ef_construction: int | None = None
+    quantization_enabled: bool | None = None
+
+    def __post_init__(self):
+        if self.similarity_function not in SIMILARITY_FUNCTIONS:
+            raise ValueError(
+                f"similarity_function must be one of {SIMILARITY_FUNCTIONS}, "
+                f"not {self.similarity_function!r}"
+            )
+        for name in ("dimensions", "hnsw_m", "hnsw_ef_construction"):
+            value = getattr(self, name)
+            if value is not None and (not isinstance(value, int) or value < 1):
+                raise ValueError(f"{name} must be a positive integer, not {value!r}")
+
+    @classmethod
+    def from_embedder(cls, embedder: Embedder, **settings) -> VectorIndexConfig:
+        return cls(dimensions=embedder.dimensions, **settings)
+
+    @property
+    def index_config(self) -> dict:
+        settings = {
+            "vector.dimensions": self.dimensions,
+            "vector.similarity_function": self.similarity_function,
+            "vector.hnsw.m": self.hnsw_m,
+            "vector.hnsw.ef_construction": self.hnsw_ef_construction,
+            "vector.quantization.enabled": self.quantization_enabled,
+        }
+        return {key: value for key, value in settings.items() if value is not None}
+
+    @property
+    def options_clause(self) -> str:
+        # index options can not be parameters, the values are validated above
+        def literal(value) -> str:
+            if isinstance(value, bool):
+                return "true" if value else "false"
+            if isinstance(value, str):
+                return f"'{value}'"
+            return str(value)
+
+        settings = ", ".join(
+            f"`{key}`: {literal(value)}" for key, value in self.index_config.items()
+        )
+        return f"OPTIONS {{indexConfig: {{{settings}}}}}"
+
+
+@dataclass(frozen=True)
+class VectorIndex:
+    name: str
+    label: str
+    property: str
+
+    def create_query(self, config: VectorIndexConfig | None = None) -> str:
+        query = (
+            f"CREATE VECTOR INDEX {self.name} IF NOT EXISTS "
+            f"FOR (n:{self.label}) ON n.{self.property}"
+        )
+        return f"{query} {config.options_clause}" if config is not None else query
+
+
+@dataclass(frozen=True)
+class FullTextIndex:
+    name: str
+    label: str
+    properties: Tuple[str, ...]
+
+    def create_query(self, config: VectorIndexConfig | None = None) -> str:
+        # config only applies to vector indexes; accepted so both kinds of
+        # index can be created the same way
+        properties = ", ".join(f"n.{property}" for property in self.properties)
+        return (
+            f"CREATE FULLTEXT INDEX {self.name} IF NOT EXISTS "
+            f"FOR (n:{self.label}) ON EACH [{properties}]"
+        )
+
+
+PDF_VECTOR_INDEX = VectorIndex("pdf", "Chunk", "embedding")
+PARENT_VECTOR_INDEX = VectorIndex("parent", "Child", "embedding")
+VECTOR_INDEXES = {
+    index.name: index for index in (PDF_VECTOR_INDEX, PARENT_VECTOR_INDEX)
+}
+PDF_FULLTEXT_INDEX = FullTextIndex("PdfChunkFullText", "Chunk", ("text",))
+# the search indexes each store function writes into
+CHUNK_INDEXES = (PDF_VECTOR_INDEX, PDF_FULLTEXT_INDEX)
+DOCUMENT_INDEXES = (PARENT_VECTOR_INDEX,)
+
+
+def create_vector_index(driver: Driver, config: VectorIndexConfig | None = None):
+    driver.execute_query(PDF_VECTOR_INDEX.create_query(config))
 
 
 def create_text_index(driver: Driver):
-    driver.execute_query(
-        "CREATE FULLTEXT INDEX PdfChunkFullText FOR (c:Chunk) ON EACH [c.text]"
-    )
+    driver.execute_query(PDF_FULLTEXT_INDEX.create_query())
+
+
+def create_graph_vector_index(driver: Driver, config: VectorIndexConfig | None = None):
+    driver.execute_query(PARENT_VECTOR_INDEX.create_query(config))
+
+
+def rebuild_vector_index(
+    driver: Driver,
+    index: VectorIndex,
+    config: VectorIndexConfig,
+    timeout: float = 3600,
+    on_progress: Callable[[str, str, float], None] | None = None,
+):
+    # IF NOT EXISTS keeps an index with stale options, so changing them needs a
+    # drop; searches against the index fail until it is ONLINE again
+    driver.execute_query(f"DROP INDEX {index.name} IF EXISTS")
+    driver.execute_query(index.create_query(config))
+    wait_for_indexes_online(driver, [index.name], timeout, on_progress)
 
 
-def create_graph_vector_index(driver: Driver):
-    driver.execute_query(
-        """
-            CREATE VECTOR INDEX parent IF NOT EXISTS
-            FOR (c:Child)
-            ON c.embedding
-        """
+@contextmanager
+def bulk_load(
+    driver: Driver,
+    indexes: Iterable[VectorIndex | FullTextIndex],
+    config: VectorIndexConfig | None = None,
+    *,
+    drop_existing: bool = True,
+    timeout: float = 3600,
+    on_progress: Callable[[str, str, float], None] | None = None,
+) -> Iterator[None]:
+    # an online index is updated on every write, which for HNSW and Lucene costs
+    # more than building it once over the loaded data; the uniqueness
+    # constraints stay, MERGE needs them. Without drop_existing, indexes that
+    # already exist are kept and only missing ones are postponed.
+    indexes = list(indexes)
+    if drop_existing:
+        for index in indexes:
+            driver.execute_query(f"DROP INDEX {index.name} IF EXISTS")
+    try:
+        yield
+    except BaseException:
+        # a failed load must not leave the database without its indexes
+        for index in indexes:
+            driver.execute_query(index.create_query(config))
+        raise
+    for index in indexes:
+        driver.execute_query(index.create_query(config))
+    # returns once every index is ONLINE, so searches after the block see all
+    # of the loaded data
+    wait_for_indexes_online(
+        driver, [index.name for index in indexes], timeout, on_progress
     )
@@ -1,9 +1,86 @@
+from __future__ import annotations
+
+import copy
+import queue
+import threading
 from abc import ABC, abstractmethod
-from typing import List
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Tuple
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from torch import Tensor, cuda
+
+from graphrag_neo4j.embedding_cache import EmbeddingCache
+from graphrag_neo4j.model_registry import (
+    ModelRegistry,
+    SharedModel,
+    default_model_registry,
+)
+
+# torch and sentence_transformers are only imported once a model is loaded, so
+# chunking, storage and search stay cheap to import
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+    from torch import Tensor
+
+
+def token_budget_batches(lengths: List[int], token_budget: int) -> List[List[int]]:
+    # longest first, so each batch is padded to the length of its first item
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches: List[List[int]] = []
+    batch: List[int] = []
+    padded_length = 0
+    for i in order:
+        if batch and (len(batch) + 1) * padded_length > token_budget:
+            batches.append(batch)
+            batch = []
+        if not batch:
+            padded_length = max(lengths[i], 1)
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+@dataclass
+class DedupStats:
+    total: int = 0
+    unique: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, total: int, unique: int):
+        with self._lock:
+            self.total += total
+            self.unique += unique
+
+    @property
+    def ratio(self) -> float:
+        # share of inputs that did not need their own forward pass
+        return 1 - self.unique / self.total if self.total else 0.0
+
+
+class LockedTokenizer:
+    # the model's fast tokenizer raises "Already borrowed" when two threads use
+    # it, e.g. a chunking thread while another encodes, and encoding changes
+    # its truncation settings; every call here holds the model lock
+    def __init__(self, tokenizer, lock: threading.RLock):
+        self._tokenizer = tokenizer
+        self._lock = lock
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            return self._tokenizer(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        value = getattr(self._tokenizer, name)
+        if not callable(value):
+            return value
+
+        def locked(*args, **kwargs):
+            with self._lock:
+                return value(*args, **kwargs)
+
+        return locked
 
 
 # Default paths can be overridden through environment variables for flexibility
@@ -14,6 +91,60 @@ class Embedder(ABC):
     ) -> list[Tensor] | np.ndarray | Tensor | list[dict[str, Tensor]]:
         pass
 
+    @property
+    def dimensions(self) -> int:
+        # embedders that know their output size override this; probing works
+        # for any of them, at the cost of one encode call
+        return int(np.asarray(self.encode(["dimensions"])).shape[-1])
+
+    def encode_stream(
+        self,
+        sentences: Iterable[str],
+        *,
+        batch_size: int = 32,
+        yield_size: int | None = None,
+        prefetch: int = 1,
+        **kwargs,
+    ) -> Iterator[Tuple[List[str], np.ndarray]]:
+        # encodes on a background thread, so batch N + 1 is embedded while the
+        # caller is still handling batch N; each yielded batch holds yield_size
+        # texts and is encoded in forward passes of batch_size
+        yield_size = yield_size or batch_size
+        batches: queue.Queue = queue.Queue(maxsize=max(prefetch, 1))
+        stopped = threading.Event()
+
+        def put(item) -> bool:
+            while not stopped.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                iterator = iter(sentences)
+                while batch := list(islice(iterator, yield_size)):
+                    embeddings = self.encode(batch, batch_size=batch_size, **kwargs)
+                    if not put((batch, embeddings)):
+                        return
+            except BaseException as error:
+                put(error)
+                return
+            put(None)
+
+        producer = threading.Thread(target=produce, name="encode-stream", daemon=True)
+        producer.start()
+        try:
+            while (item := batches.get()) is not None:
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+            producer.join()
+
 
 class EmbeddingService(Embedder):
     def __init__(
@@ -22,29 +153,275 @@ class EmbeddingService(Embedder):
         *,
         cache_dir: str,
         use_cuda: bool = True,
+        embedding_cache: EmbeddingCache | None = None,
+        token_budget: int | None = None,
+        model_registry: ModelRegistry | None = default_model_registry,
+        warm_up: bool = False,
+        deduplicate: bool = True,
     ):
         self.model_name = model_name
         self.cache_dir = cache_dir
-        self.device = "cuda" if use_cuda and cuda.is_available() else "cpu"
-        if use_cuda and not cuda.is_available():
-            print("CUDA unavailable – falling back to CPU for embeddings.")
+        self.embedding_cache = embedding_cache
+        self.token_budget = token_budget
+        self.use_cuda = use_cuda
+        self._device: str | None = None if use_cuda else "cpu"
+
+        self.model_registry = model_registry
+        self.deduplicate = deduplicate
+        self.dedup_stats = DedupStats()
+        self._shared_model: SharedModel | None = None
+        self._load_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._warm_up_thread: threading.Thread | None = None
+        self._warm_up_error: BaseException | None = None
+        if warm_up:
+            self.start_warm_up()
+
+    @property
+    def device(self) -> str:
+        if self._device is None:
+            from torch import cuda
 
-        self._model: SentenceTransformer | None = None
+            self._device = "cuda" if cuda.is_available() else "cpu"
+            if not cuda.is_available():
+                print("CUDA unavailable – falling back to CPU for embeddings.")
+        return self._device
 
     @property
     def model(self) -> SentenceTransformer:
-        if self._model is None:
-            self._model = SentenceTransformer(
-                self.model_name,
-                device=self.device,
-                cache_folder=self.cache_dir,
-                trust_remote_code=True,
+        return self.shared_model.model
+
+    @property
+    def shared_model(self) -> SharedModel:
+        if self._shared_model is None:
+            with self._load_lock:
+                if self._shared_model is None:
+                    if self.model_registry is None:
+                        shared = SharedModel(self._load_model(), references=1)
+                    else:
+                        shared = self.model_registry.acquire(
+                            self._registry_key(), self._load_model
+                        )
+                    self._shared_model = shared
+        return self._shared_model
+
+    def _registry_key(self) -> tuple:
+        return (self.model_name, self.device, self.cache_dir)
+
+    def _cache_model_id(self) -> str:
+        # namespaces EmbeddingCache keys; backends whose vectors differ from
+        # this one's for the same model must override it
+        return self.model_name
+
+    def _load_model(self) -> SentenceTransformer:
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(
+            self.model_name,
+            device=self.device,
+            cache_folder=self.cache_dir,
+            trust_remote_code=True,
+        )
+
+    def start_warm_up(self):
+        if self._warm_up_thread is None:
+            self._warm_up_thread = threading.Thread(
+                target=self._warm_up, name="embedding-warm-up", daemon=True
             )
-        return self._model
+            self._warm_up_thread.start()
+
+    def _warm_up(self):
+        try:
+            # a real forward pass, so kernels and allocator pools are initialised
+            self._encode_with_model(["warm up"], batch_size=1)
+        except BaseException as error:
+            self._warm_up_error = error
+        finally:
+            self._ready.set()
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set() and self._warm_up_error is None
 
-    def encode(self, sentences: List[str] | str, *, batch_size: int = 32, **kwargs):
+    def wait_until_ready(self, timeout: float | None = None) -> bool:
+        if self._warm_up_thread is None:
+            self.start_warm_up()
+        if not self._ready.wait(timeout):
+            return False
+        if self._warm_up_error is not None:
+            raise self._warm_up_error
+        return True
+
+    def close(self):
+        with self._load_lock:
+            if self._shared_model is not None and self.model_registry is not None:
+                self.model_registry.release(self._registry_key())
+            self._shared_model = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def encode(
+        self,
+        sentences: List[str] | str,
+        *,
+        batch_size: int = 32,
+        token_budget: int | None = None,
+        **kwargs,
+    ):
         if isinstance(sentences, str):
             sentences = [sentences]
-        return self.model.encode(
-            sentences, batch_size=batch_size, convert_to_tensor=False, **kwargs
+        if token_budget is None:
+            token_budget = self.token_budget
+        if not self.deduplicate:
+            return self._encode_unique(
+                sentences, batch_size=batch_size, token_budget=token_budget, **kwargs
+            )
+
+        positions: dict[str, int] = {}
+        inverse = [
+            positions.setdefault(sentence, len(positions)) for sentence in sentences
+        ]
+        self.dedup_stats.record(len(sentences), len(positions))
+        if len(positions) == len(sentences):
+            return self._encode_unique(
+                sentences, batch_size=batch_size, token_budget=token_budget, **kwargs
+            )
+        embeddings = self._encode_unique(
+            list(positions), batch_size=batch_size, token_budget=token_budget, **kwargs
         )
+        if isinstance(embeddings, np.ndarray):
+            return embeddings[inverse]
+        return [embeddings[i] for i in inverse]
+
+    def _encode_unique(
+        self,
+        sentences: List[str],
+        *,
+        batch_size: int,
+        token_budget: int | None,
+        **kwargs,
+    ):
+        if (
+            self.embedding_cache is None
+            or not sentences
+            or not self._is_cacheable(kwargs)
+        ):
+            return self._encode_with_model(
+                sentences, batch_size=batch_size, token_budget=token_budget, **kwargs
+            )
+        return self._encode_with_cache(
+            sentences, batch_size=batch_size, token_budget=token_budget, **kwargs
+        )
+
+    @staticmethod
+    def _is_cacheable(kwargs: dict) -> bool:
+        return kwargs.get("output_value", "sentence_embedding") == "sentence_embedding"
+
+    @property
+    def tokenizer(self) -> LockedTokenizer:
+        shared = self.shared_model
+        return LockedTokenizer(shared.model.tokenizer, shared.lock)
+
+    def chunking_tokenizer(self):
+        # a copy of its own for a thread that chunks while another encodes;
+        # the locked tokenizer would wait for every forward pass to finish
+        with self.shared_model.lock:
+            return copy.deepcopy(self.model.tokenizer)
+
+    @property
+    def dimensions(self) -> int:
+        dimensions = self.model.get_sentence_embedding_dimension()
+        return dimensions if dimensions is not None else super().dimensions
+
+    @property
+    def max_chunk_tokens(self) -> int:
+        # room left in the model's window once special tokens are added
+        return self.model.max_seq_length - self.tokenizer.num_special_tokens_to_add()
+
+    def token_lengths(self, sentences: List[str]) -> List[int]:
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            return [len(sentence.split()) + 2 for sentence in sentences]
+        with self.shared_model.lock:
+            encoded = tokenizer(
+                sentences,
+                truncation=True,
+                max_length=self.model.max_seq_length,
+                return_attention_mask=False,
+                return_token_type_ids=False,
+            )
+        return [len(input_ids) for input_ids in encoded["input_ids"]]
+
+    def _encode_with_model(
+        self,
+        sentences: List[str],
+        *,
+        batch_size: int,
+        token_budget: int | None = None,
+        **kwargs,
+    ):
+        with self.shared_model.lock:
+            return self._encode_batches(
+                sentences, batch_size=batch_size, token_budget=token_budget, **kwargs
+            )
+
+    def _encode_batches(
+        self,
+        sentences: List[str],
+        *,
+        batch_size: int,
+        token_budget: int | None = None,
+        **kwargs,
+    ):
+        if token_budget is None or len(sentences) <= 1:
+            return self.model.encode(
+                sentences, batch_size=batch_size, convert_to_tensor=False, **kwargs
+            )
+
+        embeddings: list = [None] * len(sentences)
+        for batch in token_budget_batches(self.token_lengths(sentences), token_budget):
+            batch_embeddings = self.model.encode(
+                [sentences[i] for i in batch],
+                batch_size=len(batch),
+                convert_to_tensor=False,
+                **kwargs,
+            )
+            for i, embedding in zip(batch, batch_embeddings):
+                embeddings[i] = embedding
+        if not self._is_cacheable(kwargs):
+            return embeddings
+        return np.stack(embeddings)
+
+    def _encode_with_cache(
+        self,
+        sentences: List[str],
+        *,
+        batch_size: int,
+        token_budget: int | None = None,
+        **kwargs,
+    ):
+        keys = [
+            EmbeddingCache.key(self._cache_model_id(), sentence, kwargs)
+            for sentence in sentences
+        ]
+        cached = self.embedding_cache.get_many(keys)
+
+        missing: dict[str, str] = {}
+        for key, sentence in zip(keys, sentences):
+            if key not in cached and key not in missing:
+                missing[key] = sentence
+        if missing:
+            encoded = self._encode_with_model(
+                list(missing.values()),
+                batch_size=batch_size,
+                token_budget=token_budget,
+                **kwargs,
+            )
+            computed = dict(zip(missing.keys(), np.asarray(encoded)))
+            self.embedding_cache.put_many(computed)
+            cached.update(computed)
+
+        return np.stack([cached[key] for key in keys])
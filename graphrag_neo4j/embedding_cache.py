@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, List, Mapping
+
+import numpy as np
+
+# encode kwargs that only affect how the work is scheduled, not the vectors
+_IGNORED_KWARGS = {"batch_size", "show_progress_bar", "device", "pool", "chunk_size"}
+_SQLITE_MAX_VARIABLES = 500
+
+
+# Content-addressed embedding store. WAL mode plus a busy timeout lets several
+# processes share one cache file.
+class EmbeddingCache:
+    def __init__(self, path: str, *, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                """
+                    CREATE TABLE IF NOT EXISTS embeddings (
+                        key TEXT PRIMARY KEY,
+                        dtype TEXT NOT NULL,
+                        vector BLOB NOT NULL
+                    ) WITHOUT ROWID
+                """
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite connections must not cross threads or forked processes
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def key(model_name: str, text: str, encode_kwargs: Mapping[str, Any]) -> str:
+        relevant_kwargs = {
+            name: value
+            for name, value in encode_kwargs.items()
+            if name not in _IGNORED_KWARGS
+        }
+        digest = hashlib.sha256()
+        digest.update(model_name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(json.dumps(relevant_kwargs, sort_keys=True, default=str).encode())
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        connection = self._connection()
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), _SQLITE_MAX_VARIABLES):
+            batch = unique_keys[start : start + _SQLITE_MAX_VARIABLES]
+            rows = connection.execute(
+                "SELECT key, dtype, vector FROM embeddings WHERE key IN (%s)"
+                % ",".join("?" * len(batch)),
+                batch,
+            )
+            for key, dtype, vector in rows:
+                found[key] = np.frombuffer(vector, dtype=np.dtype(dtype))
+        return found
+
+    def put_many(self, items: Mapping[str, np.ndarray]):
+        if not items:
+            return
+        rows = []
+        for key, vector in items.items():
+            vector = np.ascontiguousarray(vector)
+            rows.append((key, vector.dtype.str, vector.tobytes()))
+        with self._connection() as connection:
+            # content addressed, so a concurrent writer can only store the same value
+            connection.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, dtype, vector) VALUES (?, ?, ?)",
+                rows,
+            )
+
+    def __len__(self) -> int:
+        rows = self._connection().execute("SELECT count(*) FROM embeddings")
+        return rows.fetchone()[0]
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM embeddings")
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None and self._local.pid == os.getpid():
+            connection.close()
+        self._local = threading.local()
@@ -0,0 +1,97 @@
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List
+
+import numpy as np
+
+from graphrag_neo4j.embedder import Embedder, EmbeddingService
+
+_worker_embedder: EmbeddingService | None = None
+
+
+def _init_worker(model_name: str, cache_dir: str, threads_per_worker: int):
+    import torch
+
+    global _worker_embedder
+    torch.set_num_threads(threads_per_worker)
+    _worker_embedder = EmbeddingService(model_name, cache_dir=cache_dir, use_cuda=False)
+    # load in the initializer so the first shard does not pay for it
+    _ = _worker_embedder.model
+
+
+def _worker_dimensions() -> int:
+    assert _worker_embedder is not None
+    return _worker_embedder.dimensions
+
+
+def _encode_shard(sentences: List[str], batch_size: int, kwargs: dict):
+    assert _worker_embedder is not None
+    return np.asarray(
+        _worker_embedder.encode(sentences, batch_size=batch_size, **kwargs)
+    )
+
+
+class ProcessPoolEmbedder(Embedder):
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        cache_dir: str,
+        workers: int | None = None,
+        threads_per_worker: int = 1,
+        shard_size: int = 256,
+    ):
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.threads_per_worker = threads_per_worker
+        self.workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+        self.shard_size = shard_size
+        self._executor: ProcessPoolExecutor | None = None
+        self._dimensions: int | None = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                # fork is unsafe once torch has started its own threads
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self.model_name, self.cache_dir, self.threads_per_worker),
+            )
+        return self._executor
+
+    @property
+    def dimensions(self) -> int:
+        if self._dimensions is None:
+            self._dimensions = self.executor.submit(_worker_dimensions).result()
+        return self._dimensions
+
+    def encode(self, sentences: List[str] | str, *, batch_size: int = 32, **kwargs):
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        if not sentences:
+            return np.empty((0, self.dimensions), dtype=np.float32)
+
+        # at least one shard per worker so every core gets work
+        shard_size = min(self.shard_size, -(-len(sentences) // self.workers))
+        shard_size = max(shard_size, 1)
+        futures: List[Future] = [
+            self.executor.submit(
+                _encode_shard, sentences[start : start + shard_size], batch_size, kwargs
+            )
+            for start in range(0, len(sentences), shard_size)
+        ]
+        return np.concatenate([future.result() for future in futures])
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -1,28 +1,52 @@
+from __future__ import annotations
+
 import re
-from typing import List
+from collections import deque
+from dataclasses import dataclass
+from itertools import islice
+from typing import TYPE_CHECKING, Deque, Iterable, Iterator, List, Sequence, Tuple
 
-from store import Section
+from graphrag_neo4j.store import Section
 
+if TYPE_CHECKING:
+    from transformers import PreTrainedTokenizerFast
 
-def chunk_text_whitespace_split(text: str, chunk_size: int, overlap: int) -> List[str]:
-    chunks = []
+CHAPTER_HEAD = re.compile(r"CHAPTER\s+\d+\.\s")
+TITLE_CANDIDATE = re.compile(
+    r"^(?:CHAPTER\s+\d+\.\s|Epilogue$|Prologue$)", re.MULTILINE
+)
+STANDALONE_TITLES = ("Epilogue", "Prologue")
+# a chapter title has to end in [.!?] within this many lines
+MAX_TITLE_LINES = 4
+
+
+def iter_chunk_text_whitespace_split(
+    text: str, chunk_size: int, overlap: int
+) -> Iterator[str]:
     index = 0
+    prev_whitespace = 0
+    # spaces before this position have already been searched; the left edge only
+    # moves forward, so every character is scanned at most once
+    searched_to = 0
 
     while len(text) > index:
-        prev_whitespace = 0
         left_index = index - overlap
-        while left_index >= 0:
-            if text[left_index] == " ":
-                prev_whitespace = left_index
-                break
-            left_index -= 1
+        start = 0
+        if left_index >= 0:
+            found = text.rfind(" ", searched_to, left_index + 1)
+            if found != -1:
+                prev_whitespace = found
+            searched_to = left_index + 1
+            start = prev_whitespace
         next_whitespace = text.find(" ", index + chunk_size)
         if next_whitespace == -1:
             next_whitespace = len(text)
-        chunk = text[prev_whitespace:next_whitespace].strip()
-        chunks.append(chunk)
+        yield text[start:next_whitespace].strip()
         index = next_whitespace + 1
-    return chunks
+
+
+def chunk_text_whitespace_split(text: str, chunk_size: int, overlap: int) -> List[str]:
+    return list(iter_chunk_text_whitespace_split(text, chunk_size, overlap))
 
 
 def chunk_text_size_split(text: str, chunk_size: int, overlap: int):
@@ -38,9 +62,56 @@ def chunk_text_size_split(text: str, chunk_size: int, overlap: int):
     return chunks
 
 
+def _token_windows(
+    text: str, offsets: Sequence[Tuple[int, int]], chunk_size: int, overlap: int
+) -> Iterator[str]:
+    step = chunk_size - overlap
+    for start in range(0, len(offsets), step):
+        window = offsets[start : start + chunk_size]
+        yield text[window[0][0] : window[-1][1]]
+        if start + chunk_size >= len(offsets):
+            break
+
+
+def chunk_texts_token_split(
+    texts: List[str],
+    tokenizer: PreTrainedTokenizerFast,
+    chunk_size: int,
+    overlap: int,
+) -> List[List[str]]:
+    if overlap >= chunk_size:
+        raise ValueError("overlap must be smaller than chunk_size")
+    # one batched call for all texts; the offsets map every token back to its
+    # character span, so chunks are cut from the original text without decoding
+    encodings = tokenizer(
+        texts,
+        add_special_tokens=False,
+        return_offsets_mapping=True,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+        verbose=False,
+    )
+    return [
+        list(_token_windows(text, offsets, chunk_size, overlap))
+        for text, offsets in zip(texts, encodings["offset_mapping"])
+    ]
+
+
+def chunk_text_token_split(
+    text: str, tokenizer: PreTrainedTokenizerFast, chunk_size: int, overlap: int
+) -> List[str]:
+    return chunk_texts_token_split([text], tokenizer, chunk_size, overlap)[0]
+
+
 def chunk_text(
-    text: str, chunk_size: int, overlap: int, split_on_whitespace_only=True
+    text: str,
+    chunk_size: int,
+    overlap: int,
+    split_on_whitespace_only=True,
+    tokenizer: PreTrainedTokenizerFast | None = None,
 ) -> List[str]:
+    if tokenizer is not None:
+        return chunk_text_token_split(text, tokenizer, chunk_size, overlap)
     return (
         chunk_text_whitespace_split(text, chunk_size, overlap)
         if split_on_whitespace_only
@@ -48,17 +119,173 @@ def chunk_text(
     )
 
 
-def split_text_to_section_by_titles(text: str) -> List[Section]:
-    title_pattern = re.compile(
-        r"^(CHAPTER\s+\d+\.\s+.+?[.!?]|Epilogue|Prologue)$", re.DOTALL | re.MULTILINE
-    )
+def chunk_sections(
+    sections: Iterable[Section],
+    chunk_size: int,
+    overlap: int,
+    tokenizer: PreTrainedTokenizerFast | None = None,
+    max_group_chars: int = 1_000_000,
+) -> Iterator[Tuple[Section, List[str]]]:
+    if tokenizer is None:
+        for section in sections:
+            yield section, chunk_text(section.text, chunk_size, overlap)
+        return
 
-    titles = [title.strip().lower() for title in title_pattern.findall(text)]
-    sections = list(
-        filter(lambda text: bool(text.strip()), re.split(title_pattern, text))
-    )
+    # sections are tokenized in groups, one batched tokenizer call per group;
+    # max_group_chars bounds how much text a group holds at once
+    group: List[Section] = []
+    group_chars = 0
+    for section in sections:
+        group.append(section)
+        group_chars += len(section.text)
+        if group_chars >= max_group_chars:
+            texts = [section.text for section in group]
+            yield from zip(
+                group, chunk_texts_token_split(texts, tokenizer, chunk_size, overlap)
+            )
+            group = []
+            group_chars = 0
+    if group:
+        texts = [section.text for section in group]
+        yield from zip(
+            group, chunk_texts_token_split(texts, tokenizer, chunk_size, overlap)
+        )
 
-    return [
-        Section(id=title, text=title + sections[1 + i * 2])
-        for i, title in enumerate(titles)
+
+def title_line_count(lines: Sequence[str]) -> int:
+    if lines[0].rstrip("\r\n") in STANDALONE_TITLES:
+        return 1
+    # matched with its line break, which is the whitespace after the dot when
+    # the title itself is on a later line
+    head = CHAPTER_HEAD.match(lines[0])
+    if head is None:
+        return 0
+    for count, line in enumerate(lines[:MAX_TITLE_LINES], 1):
+        line = line.rstrip("\r\n")
+        if count == 1 and len(line) <= head.end():
+            continue
+        if line.endswith((".", "!", "?")):
+            return count
+    return 0
+
+
+@dataclass
+class SectionSpan:
+    id: str
+    start: int
+    title_end: int
+    end: int
+
+    def section(self, text: str) -> Section:
+        return Section(id=self.id, text=self.id + text[self.title_end : self.end])
+
+
+def _title_end(text: str, start: int) -> int:
+    # only the next MAX_TITLE_LINES lines are looked at, so an unterminated
+    # heading costs a bounded amount of work instead of a scan to the end
+    line_ends = []
+    position = start
+    while len(line_ends) < MAX_TITLE_LINES and position < len(text):
+        newline = text.find("\n", position)
+        position = len(text) if newline == -1 else newline + 1
+        line_ends.append(position)
+    lines = [
+        text[line_start:line_end]
+        for line_start, line_end in zip([start, *line_ends], line_ends)
     ]
+    count = title_line_count(lines)
+    if not count:
+        return -1
+    return start + len("".join(lines[:count]).rstrip("\r\n"))
+
+
+def iter_section_spans(text: str) -> Iterator[SectionSpan]:
+    current: SectionSpan | None = None
+    for candidate in TITLE_CANDIDATE.finditer(text):
+        start = candidate.start()
+        if current is not None and start < current.title_end:
+            continue
+        title_end = _title_end(text, start)
+        if title_end == -1:
+            continue
+        if current is not None:
+            current.end = start
+            yield current
+        id = text[start:title_end].strip().lower()
+        current = SectionSpan(id=id, start=start, title_end=title_end, end=len(text))
+    if current is not None:
+        yield current
+
+
+def split_text_to_section_by_titles(text: str) -> List[Section]:
+    return [span.section(text) for span in iter_section_spans(text)]
+
+
+def _file_section(title: str, part: int, body: List[str]) -> Section:
+    id = title if part == 1 else f"{title}_part_{part}"
+    return Section(id=id, text=title + "".join(body))
+
+
+def iter_file_sections(
+    path: str,
+    *,
+    max_section_chars: int | None = 1_000_000,
+    max_line_chars: int = 65_536,
+    encoding: str = "utf-8",
+) -> Iterator[Section]:
+    # reads the file incrementally; memory stays bounded by max_section_chars
+    # (oversized sections are split into numbered parts) plus a few lines of
+    # lookahead for titles that span lines
+    with open(path, encoding=encoding) as file:
+        lines = iter(lambda: file.readline(max_line_chars), "")
+        lookahead: Deque[str] = deque()
+        title: str | None = None
+        part = 1
+        body: List[str] = []
+        body_chars = 0
+        line_start = True
+
+        while True:
+            line = lookahead.popleft() if lookahead else next(lines, None)
+            if line is None:
+                break
+
+            title_lines = 0
+            if line_start:
+                if CHAPTER_HEAD.match(line):
+                    while len(lookahead) < MAX_TITLE_LINES - 1:
+                        extra = next(lines, None)
+                        if extra is None:
+                            break
+                        lookahead.append(extra)
+                title_lines = title_line_count(
+                    [line, *islice(lookahead, MAX_TITLE_LINES - 1)]
+                )
+
+            if title_lines:
+                raw_title = line + "".join(
+                    lookahead.popleft() for _ in range(title_lines - 1)
+                )
+                if title is not None:
+                    yield _file_section(title, part, body)
+                title = raw_title.strip().lower()
+                stripped = raw_title.rstrip("\r\n")
+                part = 1
+                body = [raw_title[len(stripped) :]]
+                body_chars = 0
+                line_start = raw_title.endswith("\n")
+                continue
+
+            line_start = line.endswith("\n")
+            if title is None:
+                continue
+            body.append(line)
+            body_chars += len(line)
+            if max_section_chars is not None and body_chars >= max_section_chars:
+                yield _file_section(title, part, body)
+                part += 1
+                body = []
+                body_chars = 0
+
+        if title is not None:
+            yield _file_section(title, part, body)
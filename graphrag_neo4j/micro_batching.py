@@ -0,0 +1,171 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import numpy as np
+
+from graphrag_neo4j.embedder import Embedder
+
+_CLOSE = object()
+
+
+@dataclass
+class _EncodeRequest:
+    sentences: List[str]
+    kwargs: Dict[str, Any]
+    batch_size: int | None = None
+    future: Future = field(default_factory=Future)
+
+    @property
+    def kwargs_key(self) -> tuple:
+        return tuple(sorted((name, repr(value)) for name, value in self.kwargs.items()))
+
+
+class MicroBatchingEmbedder(Embedder):
+    def __init__(
+        self,
+        embedder: Embedder,
+        *,
+        max_batch_size: int = 64,
+        max_wait: float = 0.005,
+    ):
+        self.embedder = embedder
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._requests: queue.Queue = queue.Queue()
+        self._worker: threading.Thread | None = None
+        # a request that did not fit the last window opens the next one
+        self._carried: _EncodeRequest | None = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def encode(self, sentences: List[str] | str, *, batch_size: int = 32, **kwargs):
+        return self.submit(sentences, batch_size=batch_size, **kwargs).result()
+
+    @property
+    def dimensions(self) -> int:
+        return self.embedder.dimensions
+
+    @property
+    def max_chunk_tokens(self) -> int:
+        return self.embedder.max_chunk_tokens
+
+    async def encode_async(self, sentences: List[str] | str, **kwargs):
+        return await asyncio.wrap_future(self.submit(sentences, **kwargs))
+
+    def submit(
+        self, sentences: List[str] | str, *, batch_size: int | None = None, **kwargs
+    ) -> Future:
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        request = _EncodeRequest(list(sentences), kwargs, batch_size)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MicroBatchingEmbedder is closed")
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="micro-batching-embedder", daemon=True
+                )
+                self._worker.start()
+            self._requests.put(request)
+        return request.future
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            worker = self._worker
+            self._requests.put(_CLOSE)
+        if worker is not None:
+            worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _collect(self, first: _EncodeRequest) -> tuple[List[_EncodeRequest], bool]:
+        pending = [first]
+        size = len(first.sentences)
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is _CLOSE:
+                return pending, True
+            if size + len(request.sentences) > self.max_batch_size:
+                self._carried = request
+                break
+            pending.append(request)
+            size += len(request.sentences)
+        return pending, False
+
+    def _run(self):
+        closing = False
+        while not closing:
+            request, self._carried = self._carried or self._requests.get(), None
+            if request is _CLOSE:
+                break
+            pending, closing = self._collect(request)
+
+            # requests with different encode kwargs cannot share a forward pass
+            groups: Dict[tuple, List[_EncodeRequest]] = {}
+            for request in pending:
+                groups.setdefault(request.kwargs_key, []).append(request)
+            for group in groups.values():
+                self._flush(group)
+
+        # drain whatever was queued before close() so no caller hangs
+        if self._carried is not None:
+            self._flush([self._carried])
+        while True:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is not _CLOSE:
+                self._flush([request])
+
+    def _flush(self, requests: List[_EncodeRequest]):
+        requests = [
+            request
+            for request in requests
+            if request.future.set_running_or_notify_cancel()
+        ]
+        if not requests:
+            return
+        sentences = [sentence for request in requests for sentence in request.sentences]
+        # coalescing only fills forward passes; none is larger than max_batch_size
+        # or than any caller asked for
+        batch_size = min(
+            [self.max_batch_size]
+            + [request.batch_size for request in requests if request.batch_size]
+        )
+        try:
+            embeddings = self.embedder.encode(
+                sentences, batch_size=max(batch_size, 1), **requests[0].kwargs
+            )
+        except Exception as error:
+            for request in requests:
+                request.future.set_exception(error)
+            return
+
+        offset = 0
+        for request in requests:
+            count = len(request.sentences)
+            result = embeddings[offset : offset + count]
+            if isinstance(embeddings, np.ndarray):
+                result = result.copy()
+            request.future.set_result(result)
+            offset += count
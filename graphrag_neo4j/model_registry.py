@@ -0,0 +1,61 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable
+
+
+@dataclass
+class SharedModel:
+    model: Any
+    references: int = 0
+    # fast tokenizers raise "Already borrowed" when used from several threads
+    lock: threading.RLock = field(default_factory=threading.RLock)
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[Hashable, SharedModel] = {}
+        self._loading: Dict[Hashable, threading.Lock] = {}
+
+    def acquire(self, key: Hashable, load: Callable[[], Any]) -> SharedModel:
+        with self._lock:
+            shared = self._models.get(key)
+            if shared is not None:
+                shared.references += 1
+                return shared
+            loading = self._loading.setdefault(key, threading.Lock())
+
+        # one loader per key; other keys can load in parallel
+        with loading:
+            with self._lock:
+                shared = self._models.get(key)
+                if shared is not None:
+                    shared.references += 1
+                    return shared
+            model = load()
+            with self._lock:
+                shared = SharedModel(model, references=1)
+                self._models[key] = shared
+                self._loading.pop(key, None)
+                return shared
+
+    def release(self, key: Hashable):
+        with self._lock:
+            shared = self._models.get(key)
+            if shared is None:
+                return
+            shared.references -= 1
+            if shared.references <= 0:
+                del self._models[key]
+
+    def references(self, key: Hashable) -> int:
+        with self._lock:
+            shared = self._models.get(key)
+            return shared.references if shared is not None else 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._models)
+
+
+default_model_registry = ModelRegistry()
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING, List, Literal
+
+import numpy as np
+
+from graphrag_neo4j.embedder import Embedder, EmbeddingService
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+QuantizationConfig = Literal["arm64", "avx2", "avx512", "avx512_vnni"]
+
+# Minimum cosine similarity between an ONNX vector and the PyTorch vector for the
+# same text. fp32 exports only differ by kernel rounding; int8 dynamic quantization
+# moves vectors slightly, but keeps them usable against indexes built with PyTorch.
+FP32_MIN_COSINE = 0.9999
+INT8_MIN_COSINE = 0.99
+
+
+class OnnxEmbedder(EmbeddingService):
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        cache_dir: str,
+        export_dir: str,
+        quantization: QuantizationConfig | None = None,
+        provider: str = "CPUExecutionProvider",
+        **kwargs,
+    ):
+        # set before super().__init__, which may start a warm-up thread
+        self.export_dir = export_dir
+        self.quantization = quantization
+        self.provider = provider
+        super().__init__(model_name, cache_dir=cache_dir, use_cuda=False, **kwargs)
+
+    @property
+    def file_name(self) -> str:
+        if self.quantization is None:
+            return os.path.join("onnx", "model.onnx")
+        return os.path.join("onnx", f"model_qint8_{self.quantization}.onnx")
+
+    @property
+    def min_cosine(self) -> float:
+        return FP32_MIN_COSINE if self.quantization is None else INT8_MIN_COSINE
+
+    def _registry_key(self) -> tuple:
+        return ("onnx", self.export_dir, self.file_name, self.provider)
+
+    def _cache_model_id(self) -> str:
+        # int8 vectors must never be served to the PyTorch or fp32 path, or the
+        # other way round, when they share an EmbeddingCache
+        return f"{self.model_name}:onnx:{self.file_name}"
+
+    def _load_model(self) -> SentenceTransformer:
+        if not os.path.exists(os.path.join(self.export_dir, self.file_name)):
+            self.export()
+        return self._load(self.export_dir, self.file_name)
+
+    def _load(
+        self, model_name_or_path: str, file_name: str | None
+    ) -> SentenceTransformer:
+        from sentence_transformers import SentenceTransformer
+
+        model_kwargs = {"provider": self.provider}
+        if file_name is not None:
+            model_kwargs["file_name"] = file_name
+        return SentenceTransformer(
+            model_name_or_path,
+            device="cpu",
+            backend="onnx",
+            cache_folder=self.cache_dir,
+            model_kwargs=model_kwargs,
+            trust_remote_code=True,
+        )
+
+    def export(self):
+        fp32_path = os.path.join(self.export_dir, "onnx", "model.onnx")
+        if os.path.exists(fp32_path):
+            model = self._load(self.export_dir, os.path.join("onnx", "model.onnx"))
+        else:
+            # sentence-transformers exports to ONNX when the checkpoint has no graph
+            model = self._load(self.model_name, None)
+            model.save_pretrained(self.export_dir)
+
+        if self.quantization is not None:
+            from sentence_transformers import export_dynamic_quantized_onnx_model
+
+            export_dynamic_quantized_onnx_model(
+                model, self.quantization, self.export_dir
+            )
+
+
+def cosine_similarities(reference: np.ndarray, candidate: np.ndarray) -> np.ndarray:
+    reference = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    candidate = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    return np.sum(reference * candidate, axis=1)
+
+
+def verify_compatibility(
+    reference: Embedder,
+    candidate: OnnxEmbedder,
+    sentences: List[str],
+    *,
+    min_cosine: float | None = None,
+) -> float:
+    if min_cosine is None:
+        min_cosine = candidate.min_cosine
+    worst = float(
+        cosine_similarities(
+            np.asarray(reference.encode(sentences)),
+            np.asarray(candidate.encode(sentences)),
+        ).min()
+    )
+    if worst < min_cosine:
+        raise ValueError(
+            f"ONNX embeddings diverge from the reference model: "
+            f"min cosine {worst:.5f} < {min_cosine}"
+        )
+    return worst
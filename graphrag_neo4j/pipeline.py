@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import contextlib
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Tuple
+
+from neo4j import Driver
+
+from graphrag_neo4j.store import (
+    Section,
+    resolve_chunk_size,
+    section_payloads,
+    store_sections,
+)
+
+if TYPE_CHECKING:
+    from transformers import PreTrainedTokenizerFast
+
+    from graphrag_neo4j.embedder import Embedder
+
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    name: str
+    items: int = 0
+    rows: int = 0
+    busy_seconds: float = 0.0
+    idle_seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.busy_seconds if self.busy_seconds else 0.0
+
+
+@dataclass
+class EmbeddedSection:
+    section: Section
+    children: List[str]
+    embeddings: Any
+
+
+class _Stopped(Exception):
+    pass
+
+
+class IngestionPipeline:
+    def __init__(
+        self,
+        driver: Driver,
+        embedder: Embedder,
+        pdf_id: str,
+        *,
+        chunk_size: int | None = None,
+        overlap: int = 64,
+        tokenizer: PreTrainedTokenizerFast | None = None,
+        embed_batch_size: int = 1024,
+        batch_size: int = 32,
+        rows_per_transaction: int = 5000,
+        queue_size: int = 8,
+        native_vectors: bool = False,
+    ):
+        self.driver = driver
+        self.embedder = embedder
+        self.pdf_id = pdf_id
+        self.chunk_size = resolve_chunk_size(embedder, chunk_size, tokenizer)
+        self.overlap = overlap
+        # used on the chunk thread while the embed thread encodes; pass
+        # EmbeddingService.chunking_tokenizer(), not the model's own tokenizer,
+        # or chunking waits on every forward pass
+        self.tokenizer = tokenizer
+        self.embed_batch_size = embed_batch_size
+        self.batch_size = batch_size
+        self.rows_per_transaction = rows_per_transaction
+        self.queue_size = queue_size
+        self.native_vectors = native_vectors
+        self.stats: Dict[str, StageStats] = {}
+
+    def run(self, sections: Iterable[Section]) -> Dict[str, StageStats]:
+        self.stats = {name: StageStats(name) for name in ("chunk", "embed", "write")}
+        self._stopped = threading.Event()
+        self._errors: List[BaseException] = []
+        chunked: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        embedded: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        stages = [
+            threading.Thread(
+                target=self._stage, args=(self._chunk, sections, chunked), name="chunk"
+            ),
+            threading.Thread(
+                target=self._stage, args=(self._embed, chunked, embedded), name="embed"
+            ),
+            threading.Thread(
+                target=self._stage, args=(self._write, embedded, None), name="write"
+            ),
+        ]
+        for stage in stages:
+            stage.start()
+        for stage in stages:
+            stage.join()
+        if self._errors:
+            raise self._errors[0]
+        return self.stats
+
+    def _stage(self, work: Callable, source: Any, sink: queue.Queue | None):
+        try:
+            work(source, sink)
+        except _Stopped:
+            pass
+        except BaseException as error:
+            self._errors.append(error)
+            self._stopped.set()
+        finally:
+            if sink is not None:
+                with contextlib.suppress(_Stopped):
+                    self._put(sink, _DONE)
+
+    def _put(self, sink: queue.Queue, item: Any):
+        # bounded queues give back-pressure; poll so a failed stage unblocks us
+        while True:
+            if self._stopped.is_set():
+                raise _Stopped()
+            try:
+                sink.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, source: queue.Queue, stats: StageStats) -> Any:
+        start = time.perf_counter()
+        try:
+            while True:
+                if self._stopped.is_set():
+                    raise _Stopped()
+                try:
+                    return source.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+        finally:
+            stats.idle_seconds += time.perf_counter() - start
+
+    def _chunk(self, sections: Iterable[Section], sink: queue.Queue):
+        from graphrag_neo4j.ingestion import chunk_sections
+
+        stats = self.stats["chunk"]
+        chunked = chunk_sections(
+            sections, self.chunk_size, self.overlap, self.tokenizer
+        )
+        while True:
+            start = time.perf_counter()
+            item = next(chunked, None)
+            stats.busy_seconds += time.perf_counter() - start
+            if item is None:
+                break
+            section, chunks = item
+            stats.items += 1
+            stats.rows += len(chunks)
+            self._put(sink, (section, chunks))
+
+    def _embed(self, source: queue.Queue, sink: queue.Queue):
+        stats = self.stats["embed"]
+        done = False
+        while not done:
+            item = self._get(source, stats)
+            if item is _DONE:
+                break
+            batch: List[Tuple[Section, List[str]]] = [item]
+            size = len(item[1])
+            # top the batch up with whatever is already chunked
+            while size < self.embed_batch_size:
+                try:
+                    item = source.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    done = True
+                    break
+                batch.append(item)
+                size += len(item[1])
+
+            start = time.perf_counter()
+            texts = [chunk for _, chunks in batch for chunk in chunks]
+            embeddings = (
+                self.embedder.encode(texts, batch_size=self.batch_size) if texts else []
+            )
+            stats.busy_seconds += time.perf_counter() - start
+            stats.items += len(batch)
+            stats.rows += len(texts)
+
+            offset = 0
+            for section, chunks in batch:
+                section_embeddings = embeddings[offset : offset + len(chunks)]
+                offset += len(chunks)
+                self._put(sink, EmbeddedSection(section, chunks, section_embeddings))
+
+    def _write(self, source: queue.Queue, _):
+        stats = self.stats["write"]
+        done = False
+        while not done:
+            item = self._get(source, stats)
+            if item is _DONE:
+                break
+            batch: List[EmbeddedSection] = [item]
+            rows = len(item.children)
+            # fill the transaction with whatever is already embedded
+            while rows < self.rows_per_transaction:
+                try:
+                    item = source.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    done = True
+                    break
+                batch.append(item)
+                rows += len(item.children)
+
+            start = time.perf_counter()
+            for payload in section_payloads(
+                ((item.section, item.children, item.embeddings) for item in batch),
+                self.rows_per_transaction,
+                self.native_vectors,
+            ):
+                store_sections(self.driver, self.pdf_id, payload, self.native_vectors)
+            stats.busy_seconds += time.perf_counter() - start
+            stats.items += len(batch)
+            stats.rows += rows
@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Tuple
+
+from graphrag_neo4j.embedder import Embedder
+
+
+@dataclass
+class QueryCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_size: int = 1024, *, ttl: float | None = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = QueryCacheStats()
+        self._entries: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_encode(self, embedder: Embedder, question: str):
+        key = (embedder, question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, embedding = entry
+                if self.ttl is None or time.monotonic() - created_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.stats.hits += 1
+                    return embedding
+                del self._entries[key]
+                self.stats.expirations += 1
+            self.stats.misses += 1
+
+        # encode outside the lock so a slow forward pass does not block hits
+        embedding = embedder.encode([question])[0]
+        if hasattr(embedding, "setflags"):
+            embedding.setflags(write=False)
+
+        with self._lock:
+            if self.max_size > 0:
+                self._entries[key] = (time.monotonic(), embedding)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.stats.evictions += 1
+        return embedding
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.stats = QueryCacheStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,75 @@
+import argparse
+import os
+
+from dotenv import load_dotenv
+from neo4j import GraphDatabase
+
+from graphrag_neo4j.db_setup import (
+    SIMILARITY_FUNCTIONS,
+    VECTOR_INDEXES,
+    VectorIndexConfig,
+    rebuild_vector_index,
+)
+
+load_dotenv()
+
+
+URI = os.getenv("URI", "neo4j://localhost:7687")
+USER = os.getenv("USER", "neo4j")
+PASSWORD = os.getenv("PASSWORD", "password")
+AUTH = (USER, PASSWORD)
+EMBED_MODEL = os.getenv("EMBED_MODEL", "")
+CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "")
+
+
+def embedder_dimensions() -> int:
+    from graphrag_neo4j.embedder import EmbeddingService
+
+    with EmbeddingService(EMBED_MODEL, cache_dir=CACHE_DIR) as embedder:
+        return embedder.dimensions
+
+
+def print_progress(name: str, state: str, percent: float):
+    print(f"{name}: {state} {percent:.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Drop a vector index and build it again with new settings."
+    )
+    parser.add_argument("index", choices=sorted(VECTOR_INDEXES))
+    parser.add_argument(
+        "--dimensions",
+        type=int,
+        help="defaults to the output size of EMBED_MODEL",
+    )
+    parser.add_argument("--similarity", choices=SIMILARITY_FUNCTIONS, default="cosine")
+    parser.add_argument("--m", type=int, help="HNSW links per node")
+    parser.add_argument("--ef-construction", type=int, help="HNSW build beam width")
+    parser.add_argument(
+        "--quantization", action=argparse.BooleanOptionalAction, default=None
+    )
+    parser.add_argument("--timeout", type=float, default=3600)
+    args = parser.parse_args()
+
+    config = VectorIndexConfig(
+        dimensions=args.dimensions or embedder_dimensions(),
+        similarity_function=args.similarity,
+        hnsw_m=args.m,
+        hnsw_ef_construction=args.ef_construction,
+        quantization_enabled=args.quantization,
+    )
+    index = VECTOR_INDEXES[args.index]
+    with GraphDatabase.driver(URI, auth=AUTH) as driver:
+        previous = driver.execute_query(
+            "SHOW INDEXES YIELD name, options WHERE name = $name RETURN options",
+            name=index.name,
+        ).records
+        if previous:
+            print(f"previous: {previous[0]['options'].get('indexConfig')}")
+        print(f"rebuilding {index.name} with {config.index_config}")
+        rebuild_vector_index(driver, index, config, args.timeout, print_progress)
+
+
+if __name__ == "__main__":
+    main()
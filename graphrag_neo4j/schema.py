@@ -0,0 +1,83 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, List
+
+from neo4j import Driver
+
+
+@dataclass(frozen=True)
+class UniquenessConstraint:
+    name: str
+    label: str
+    property: str
+
+    @property
+    def create_query(self) -> str:
+        return (
+            f"CREATE CONSTRAINT {self.name} IF NOT EXISTS "
+            f"FOR (n:{self.label}) REQUIRE n.{self.property} IS UNIQUE"
+        )
+
+
+# every key store.py MERGEs on; without these each MERGE is a label scan
+STORE_CONSTRAINTS = [
+    UniquenessConstraint("chunk_index", "Chunk", "index"),
+    UniquenessConstraint("pdf_id", "PDF", "id"),
+    UniquenessConstraint("parent_id", "Parent", "id"),
+    UniquenessConstraint("child_id", "Child", "id"),
+]
+
+
+def apply_constraints(
+    driver: Driver,
+    constraints: Iterable[UniquenessConstraint] = STORE_CONSTRAINTS,
+    timeout: float = 300,
+):
+    constraints = list(constraints)
+    for constraint in constraints:
+        driver.execute_query(constraint.create_query)
+    # a uniqueness constraint is backed by an index with the same name
+    wait_for_indexes_online(
+        driver, [constraint.name for constraint in constraints], timeout
+    )
+
+
+def wait_for_indexes_online(
+    driver: Driver,
+    names: List[str],
+    timeout: float = 300,
+    on_progress: Callable[[str, str, float], None] | None = None,
+    poll_interval: float = 1.0,
+):
+    deadline = time.monotonic() + timeout
+    while True:
+        records = driver.execute_query(
+            """
+                SHOW INDEXES YIELD name, state, populationPercent
+                WHERE name IN $names
+                RETURN name, state, populationPercent
+            """,
+            names=names,
+        ).records
+        states = {record["name"]: record for record in records}
+
+        missing = [name for name in names if name not in states]
+        if missing:
+            raise RuntimeError(f"Indexes do not exist: {', '.join(missing)}")
+        failed = [
+            name for name, record in states.items() if record["state"] == "FAILED"
+        ]
+        if failed:
+            raise RuntimeError(f"Indexes failed to populate: {', '.join(failed)}")
+
+        if on_progress is not None:
+            for name, record in states.items():
+                on_progress(name, record["state"], record["populationPercent"])
+        if all(record["state"] == "ONLINE" for record in states.values()):
+            return
+        if time.monotonic() >= deadline:
+            pending = [
+                name for name, record in states.items() if record["state"] != "ONLINE"
+            ]
+            raise TimeoutError(f"Indexes not ONLINE after {timeout}s: {pending}")
+        time.sleep(poll_interval)
@@ -1,16 +1,32 @@
 from neo4j import Driver, EagerResult
 
 from graphrag_neo4j.embedder import Embedder
+from graphrag_neo4j.query_cache import QueryEmbeddingCache
 
+default_query_cache = QueryEmbeddingCache(max_size=1024, ttl=3600)
 
-def vector_search(driver: Driver, embedder: Embedder, question: str) -> EagerResult:
+
+def embed_question(
+    embedder: Embedder, question: str, query_cache: QueryEmbeddingCache | None
+):
+    if query_cache is None:
+        return embedder.encode([question])[0]
+    return query_cache.get_or_encode(embedder, question)
+
+
+def vector_search(
+    driver: Driver,
+    embedder: Embedder,
+    question: str,
+    query_cache: QueryEmbeddingCache | None = default_query_cache,
+) -> EagerResult:
     return driver.execute_query(
         """
             CALL db.index.vector.queryNodes('pdf', 2, $question_embedding)
             YIELD node AS hits, score
             RETURN hits.text AS text, score, hits.index AS index
         """,
-        question_embedding=embedder.encode(question)[0],
+        question_embedding=embed_question(embedder, question, query_cache),
     )
 
 
@@ -26,9 +42,13 @@ def text_search(driver: Driver, question: str) -> EagerResult:
 
 
 def hybrid_search(
-    driver: Driver, embedder: Embedder, question: str, k: int = 2
+    driver: Driver,
+    embedder: Embedder,
+    question: str,
+    k: int = 2,
+    query_cache: QueryEmbeddingCache | None = default_query_cache,
 ) -> EagerResult:
-    question_embedding = embedder.encode(question)[0]
+    question_embedding = embed_question(embedder, question, query_cache)
     return driver.execute_query(
         """
             CALL () {
@@ -62,8 +82,9 @@ def graph_vector_search(
     index_name: str,
     question: str,
     k: int = 4,
+    query_cache: QueryEmbeddingCache | None = default_query_cache,
 ) -> EagerResult:
-    question_embedding = embedder.encode([question])[0]
+    question_embedding = embed_question(embedder, question, query_cache)
     return driver.execute_query(
         """
             CALL db.index.vector.queryNodes($index_name, $k * 4, $question_embedding)
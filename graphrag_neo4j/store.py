@@ -1,11 +1,31 @@
-from dataclasses import dataclass
-from typing import List
+from __future__ import annotations
+
+import hashlib
+from collections import deque
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+)
 
-import numpy as np
 from neo4j import Driver
-from torch import Tensor
 
-from graphrag_neo4j.embedder import Embedder
+from graphrag_neo4j.vectors import set_embedding, vector_values
+
+if TYPE_CHECKING:
+    import numpy as np
+    from torch import Tensor
+    from transformers import PreTrainedTokenizerFast
+
+    from graphrag_neo4j.embedder import Embedder
+    from graphrag_neo4j.writer_pool import WriterPool
 
 
 @dataclass
@@ -20,48 +40,441 @@ class Section:
     text: str
 
 
+def content_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def store_node_query(native_vectors: bool = False) -> str:
+    return f"""
+        WITH $chunks as chunks, range(0, size($chunks) - 1) AS index
+        UNWIND index AS i
+        WITH i, chunks[i] AS chunk, $embeddings[i] AS embedding
+        MERGE (c:Chunk {{index: $start_index + i}})
+        SET c.text = chunk, c.hash = $hashes[i]
+        WITH c, embedding
+        {set_embedding("c", "embedding", native_vectors)}
+    """
+
+
 def store_node(
     driver: Driver,
     document: Document,
+    start_index: int = 0,
+    rows_per_transaction: int | None = 5000,
+    native_vectors: bool = False,
+):
+    query = store_node_query(native_vectors)
+    # each slice is its own message and transaction, so neither the Bolt payload
+    # nor the server's transaction state grows with the document
+    step = rows_per_transaction or max(len(document.text), 1)
+    for offset in range(0, len(document.text), step):
+        chunks = document.text[offset : offset + step]
+        driver.execute_query(
+            query,
+            chunks=chunks,
+            hashes=[content_hash(chunk) for chunk in chunks],
+            embeddings=vector_values(
+                document.embeddings[offset : offset + step], native_vectors
+            ),
+            start_index=start_index + offset,
+        )
+
+
+def store_chunks(
+    driver: Driver,
+    embedder: Embedder,
+    chunks: Iterable[str],
+    embed_batch_size: int = 256,
+    batch_size: int = 32,
+    rows_per_transaction: int | None = 5000,
+    native_vectors: bool = False,
+):
+    index = 0
+    for texts, embeddings in embedder.encode_stream(
+        chunks, batch_size=batch_size, yield_size=embed_batch_size
+    ):
+        store_node(
+            driver,
+            Document(text=texts, embeddings=embeddings),
+            index,
+            rows_per_transaction,
+            native_vectors,
+        )
+        index += len(texts)
+
+
+def store_sections_query(native_vectors: bool = False, link_pdf: bool = True) -> str:
+    # without link_pdf the query never writes to the PDF node, so concurrent
+    # writers do not queue on its lock; LINK_PARENTS_QUERY adds the links later
+    merge_pdf = "MERGE (pdf:PDF {id: $pdf_id}) WITH pdf" if link_pdf else ""
+    merge_has_parent = "MERGE (pdf)-[:HAS_PARENT]->(p)" if link_pdf else ""
+    return f"""
+        {merge_pdf}
+        UNWIND $sections AS section
+        MERGE (p:Parent {{id: $pdf_id + '_' + section.id}})
+        SET p.text = coalesce(section.text, p.text),
+            p.hash = coalesce(section.hash, p.hash)
+        {merge_has_parent}
+        WITH p, section
+        UNWIND section.children AS child
+        MERGE (c:Child {{id: $pdf_id + '_' + section.id + '_' + toString(child.index)}})
+        SET c.text = child.text, c.hash = child.hash
+        WITH p, c, child.embedding AS embedding
+        {set_embedding("c", "embedding", native_vectors)}
+        MERGE (p)-[:HAS_CHILD]->(c)
+    """
+
+
+LINK_PARENTS_QUERY = """
+    MERGE (pdf:PDF {id: $pdf_id})
+    WITH pdf
+    UNWIND $ids AS id
+    MATCH (p:Parent {id: $pdf_id + '_' + id})
+    MERGE (pdf)-[:HAS_PARENT]->(p)
+"""
+
+
+def section_payloads(
+    items: Iterable[Tuple[Section, List[str], Any]],
+    rows_per_transaction: int,
+    native_vectors: bool = False,
+) -> Iterator[List[dict]]:
+    return indexed_section_payloads(
+        (
+            (section, range(len(children)), children, embeddings)
+            for section, children, embeddings in items
+        ),
+        rows_per_transaction,
+        native_vectors,
+    )
+
+
+def indexed_section_payloads(
+    items: Iterable[Tuple[Section, Sequence[int], List[str], Any]],
+    rows_per_transaction: int,
+    native_vectors: bool = False,
+) -> Iterator[List[dict]]:
+    # a section with more children than fit is split across transactions; the
+    # later parts carry no parent text, so they leave it as it is
+    rows_per_transaction = max(rows_per_transaction, 1)
+    batch: List[dict] = []
+    rows = 0
+    for section, indexes, children, embeddings in items:
+        vectors = vector_values(embeddings, native_vectors)
+        offset = 0
+        while True:
+            if batch and rows >= rows_per_transaction:
+                yield batch
+                batch = []
+                rows = 0
+            end = offset + rows_per_transaction - rows
+            batch.append(
+                {
+                    "id": section.id,
+                    "text": section.text if offset == 0 else None,
+                    "hash": content_hash(section.text) if offset == 0 else None,
+                    "children": [
+                        {
+                            "index": index,
+                            "text": text,
+                            "hash": content_hash(text),
+                            "embedding": vector,
+                        }
+                        for index, text, vector in zip(
+                            indexes[offset:end],
+                            children[offset:end],
+                            vectors[offset:end],
+                        )
+                    ],
+                }
+            )
+            rows += max(len(children[offset:end]), 1)
+            offset = end
+            if offset >= len(children):
+                break
+    if batch:
+        yield batch
+
+
+def store_sections(
+    driver: Driver, pdf_id: str, payload: List[dict], native_vectors: bool = False
 ):
     driver.execute_query(
-        """
-            WITH $chunks as chunks, range(0, size($chunks)) AS index
-            UNWIND index AS i
-            WITH i, chunks[i] AS chunk, $embeddings[i] AS embedding
-            MERGE (c:Chunk {index: i})
-            SET c.text = chunk, c.embedding = embedding
-        """,
-        chunks=document.text,
-        embeddings=document.embeddings,
+        store_sections_query(native_vectors), pdf_id=pdf_id, sections=payload
     )
 
 
+def split_embeddings_by_section(
+    batches: Iterable[Tuple[List[str], Any]],
+    pending: Deque[Tuple[Section, List[str]]],
+) -> Iterator[Tuple[Section, List[str], list]]:
+    # pending is filled by the producer before it hands over a section's chunks,
+    # so every embedded chunk belongs to a section already queued there
+    buffer: list = []
+    for _, embeddings in batches:
+        buffer.extend(embeddings)
+        while pending and len(buffer) >= len(pending[0][1]):
+            section, chunks = pending.popleft()
+            yield section, chunks, buffer[: len(chunks)]
+            del buffer[: len(chunks)]
+    while pending:
+        section, chunks = pending.popleft()
+        yield section, chunks, buffer[: len(chunks)]
+        del buffer[: len(chunks)]
+
+
+def resolve_chunk_size(
+    embedder: Embedder,
+    chunk_size: int | None,
+    tokenizer: PreTrainedTokenizerFast | None,
+) -> int:
+    # without a tokenizer chunk_size counts characters; with one it counts
+    # tokens, and a chunk longer than the model's window is silently truncated
+    if tokenizer is None:
+        return 512 if chunk_size is None else chunk_size
+    max_chunk_tokens = getattr(embedder, "max_chunk_tokens", None)
+    if chunk_size is None:
+        if max_chunk_tokens is None:
+            raise ValueError(
+                f"{type(embedder).__name__} has no max_chunk_tokens, "
+                "pass chunk_size with the tokenizer"
+            )
+        return max_chunk_tokens
+    if max_chunk_tokens is not None and chunk_size > max_chunk_tokens:
+        raise ValueError(
+            f"chunk_size {chunk_size} is above the {max_chunk_tokens} tokens "
+            "the model embeds without truncating"
+        )
+    return chunk_size
+
+
 def store_document(
-    driver: Driver, embedder: Embedder, id: str, sections: List[Section]
+    driver: Driver,
+    embedder: Embedder,
+    id: str,
+    sections: Iterable[Section],
+    embed_batch_size: int = 1024,
+    batch_size: int = 32,
+    chunk_size: int | None = None,
+    overlap: int = 64,
+    tokenizer: PreTrainedTokenizerFast | None = None,
+    rows_per_transaction: int = 5000,
+    writer_pool: WriterPool | None = None,
+    native_vectors: bool = False,
 ):
-    from graphrag_neo4j.ingestion import chunk_text
-
-    cypher_import_query = """
-        MERGE (pdf:PDF {id:$pdf_id})
-        MERGE (p:Parent {id:$pdf_id + '_' + $id})
-        SET p.text = $parent
-        MERGE (pdf)-[:HAS_PARENT]->(p)
-        WITH p, $children AS children, $embeddings as embeddings
-        UNWIND range(0, size(children) - 1) AS child_index
-        MERGE (c:Child {id: $pdf_id + '_' + $id + '_' + toString(child_index)})
-        SET c.text = children[child_index], c.embedding = embeddings[child_index]
-        MERGE (p)-[:HAS_CHILD]->(c);
-    """
+    from graphrag_neo4j.ingestion import chunk_sections
 
-    for section in sections:
-        chunked_sections = chunk_text(section.text, 512, 64)
-        embeddings = embedder.encode(chunked_sections)
-        driver.execute_query(
-            cypher_import_query,
-            parent=section.text,
-            id=section.id,
+    chunk_size = resolve_chunk_size(embedder, chunk_size, tokenizer)
+    pending: Deque[Tuple[Section, List[str]]] = deque()
+
+    def children():
+        for section, chunks in chunk_sections(sections, chunk_size, overlap, tokenizer):
+            pending.append((section, chunks))
+            yield from chunks
+
+    # children of many sections share each encode call; the vectors are split
+    # back per section once all of its children are embedded
+    batches = embedder.encode_stream(
+        children(), batch_size=batch_size, yield_size=embed_batch_size
+    )
+    payloads = section_payloads(
+        split_embeddings_by_section(batches, pending),
+        rows_per_transaction,
+        native_vectors,
+    )
+    if writer_pool is None:
+        for payload in payloads:
+            store_sections(driver, id, payload, native_vectors)
+        return
+
+    query = store_sections_query(native_vectors, link_pdf=False)
+    section_ids: Dict[str, None] = {}
+    key = None
+    for payload in payloads:
+        # a payload that continues a section split off the previous one keeps
+        # its key, so every part of a Parent is written on the same lane
+        if key is None or payload[0]["text"] is not None:
+            key = payload[0]["id"]
+        section_ids.update(dict.fromkeys(section["id"] for section in payload))
+        writer_pool.submit(
+            key,
+            query,
+            rows=sum(len(section["children"]) for section in payload),
             pdf_id=id,
-            children=chunked_sections,
-            embeddings=embeddings,
+            sections=payload,
+        )
+    writer_pool.wait()
+
+    # every HAS_PARENT relationship locks the one PDF node, so they are written
+    # here, serially, instead of by the parallel writers
+    ids = list(section_ids)
+    step = max(rows_per_transaction, 1)
+    for offset in range(0, len(ids), step):
+        driver.execute_query(
+            LINK_PARENTS_QUERY, pdf_id=id, ids=ids[offset : offset + step]
+        )
+
+
+def store_file(
+    driver: Driver,
+    embedder: Embedder,
+    id: str,
+    path: str,
+    max_section_chars: int | None = 1_000_000,
+    **kwargs,
+):
+    from graphrag_neo4j.ingestion import iter_file_sections
+
+    store_document(
+        driver,
+        embedder,
+        id,
+        iter_file_sections(path, max_section_chars=max_section_chars),
+        **kwargs,
+    )
+
+
+@dataclass
+class ChangeCounts:
+    added: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    removed: int = 0
+
+
+@dataclass
+class RefreshSummary:
+    sections: ChangeCounts = field(default_factory=ChangeCounts)
+    children: ChangeCounts = field(default_factory=ChangeCounts)
+
+
+STORED_SECTIONS_QUERY = """
+    MATCH (:PDF {id: $pdf_id})-[:HAS_PARENT]->(p:Parent)
+    RETURN p.id AS id, p.hash AS hash,
+        [(p)-[:HAS_CHILD]->(c:Child) | {id: c.id, hash: c.hash}] AS children
+"""
+
+DELETE_CHILDREN_QUERY = """
+    UNWIND $ids AS id
+    MATCH (c:Child {id: id})
+    DETACH DELETE c
+"""
+
+DELETE_PARENTS_QUERY = """
+    UNWIND $ids AS id
+    MATCH (p:Parent {id: id})
+    DETACH DELETE p
+"""
+
+
+def stored_sections(
+    driver: Driver, pdf_id: str
+) -> Dict[str, Tuple[str | None, Dict[str, str | None]]]:
+    # hashes only, the stored text and embeddings never leave the database
+    records = driver.execute_query(STORED_SECTIONS_QUERY, pdf_id=pdf_id).records
+    return {
+        record["id"]: (
+            record["hash"],
+            {child["id"]: child["hash"] for child in record["children"]},
         )
+        for record in records
+    }
+
+
+def delete_nodes(driver: Driver, query: str, ids: List[str], batch_size: int):
+    batch_size = max(batch_size, 1)
+    for offset in range(0, len(ids), batch_size):
+        driver.execute_query(query, ids=ids[offset : offset + batch_size])
+
+
+def refresh_document(
+    driver: Driver,
+    embedder: Embedder,
+    id: str,
+    sections: Iterable[Section],
+    embed_batch_size: int = 1024,
+    batch_size: int = 32,
+    chunk_size: int | None = None,
+    overlap: int = 64,
+    tokenizer: PreTrainedTokenizerFast | None = None,
+    rows_per_transaction: int = 5000,
+    native_vectors: bool = False,
+) -> RefreshSummary:
+    # children are matched by position, so an edit that shifts the chunk
+    # boundaries rewrites the rest of its section; an EmbeddingCache on the
+    # embedder still saves encoding the chunks whose text is unchanged. Nodes
+    # stored before hashes existed count as changed. Changing the embedding
+    # model needs a full store_document, the hashes only cover the text.
+    from graphrag_neo4j.ingestion import chunk_sections
+
+    chunk_size = resolve_chunk_size(embedder, chunk_size, tokenizer)
+    stored = stored_sections(driver, id)
+    summary = RefreshSummary()
+    stale_children: List[str] = []
+    pending: Deque[Tuple[Section, List[str]]] = deque()
+    changed_indexes: Deque[List[int]] = deque()
+
+    def changed_children():
+        for section, chunks in chunk_sections(sections, chunk_size, overlap, tokenizer):
+            parent_id = f"{id}_{section.id}"
+            hashes = {
+                f"{parent_id}_{index}": content_hash(chunk)
+                for index, chunk in enumerate(chunks)
+            }
+            if parent_id not in stored:
+                summary.sections.added += 1
+                stored_hash, stored_children = None, {}
+            else:
+                stored_hash, stored_children = stored.pop(parent_id)
+                if stored_hash == content_hash(section.text) and (
+                    stored_children == hashes
+                ):
+                    summary.sections.unchanged += 1
+                    summary.children.unchanged += len(chunks)
+                    continue
+                summary.sections.changed += 1
+
+            indexes = []
+            for index, child_id in enumerate(hashes):
+                if child_id not in stored_children:
+                    summary.children.added += 1
+                    indexes.append(index)
+                elif stored_children.pop(child_id) != hashes[child_id]:
+                    summary.children.changed += 1
+                    indexes.append(index)
+                else:
+                    summary.children.unchanged += 1
+            stale_children.extend(stored_children)
+            summary.children.removed += len(stored_children)
+
+            # indexes first: once the section is pending it may be split off
+            # before this generator resumes
+            changed = [chunks[index] for index in indexes]
+            changed_indexes.append(indexes)
+            pending.append((section, changed))
+            yield from changed
+
+    batches = embedder.encode_stream(
+        changed_children(), batch_size=batch_size, yield_size=embed_batch_size
+    )
+    payloads = indexed_section_payloads(
+        (
+            (section, changed_indexes.popleft(), children, embeddings)
+            for section, children, embeddings in split_embeddings_by_section(
+                batches, pending
+            )
+        ),
+        rows_per_transaction,
+        native_vectors,
+    )
+    for payload in payloads:
+        store_sections(driver, id, payload, native_vectors)
+
+    # whatever is left in stored was not part of this version of the document
+    for _, stored_children in stored.values():
+        stale_children.extend(stored_children)
+        summary.children.removed += len(stored_children)
+    summary.sections.removed = len(stored)
+    delete_nodes(driver, DELETE_CHILDREN_QUERY, stale_children, rows_per_transaction)
+    delete_nodes(driver, DELETE_PARENTS_QUERY, list(stored), rows_per_transaction)
+    return summary
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from typing import Any, List
+
+import numpy as np
+
+# the native vector type needs the 6.x driver and a server speaking Bolt 6
+# (Neo4j 2025.10 or later); everything else works with the 5.x driver
+try:
+    from neo4j.vector import Vector
+except ImportError:
+    Vector = None
+
+
+def as_float32(embeddings: Any) -> np.ndarray:
+    if not isinstance(embeddings, np.ndarray) and hasattr(embeddings, "cpu"):
+        embeddings = embeddings.detach().cpu().numpy()
+    # no copy for the float32 arrays EmbeddingService.encode returns
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def vector_values(embeddings: Any, native: bool = False) -> List:
+    array = as_float32(embeddings)
+    if native:
+        if Vector is None:
+            raise RuntimeError("Native vectors need the neo4j driver 6.0 or later")
+        # packed as one float32 byte string per vector instead of a list of
+        # 64 bit floats, under half the bytes on the wire
+        return [Vector.from_numpy(row) for row in array]
+    # a single C level conversion; the 5.x driver packs each element as a 64 bit
+    # float whatever the input, and packs plain floats fastest
+    return array.tolist()
+
+
+def set_embedding(node: str, value: str, native: bool = False) -> str:
+    if native:
+        return f"SET {node}.embedding = {value}"
+    # stores a float32 array, where SET would store the list as float64
+    return f"CALL db.create.setNodeVectorProperty({node}, 'embedding', {value})"
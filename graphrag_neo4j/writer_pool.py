@@ -0,0 +1,121 @@
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Hashable, List
+
+from neo4j import Driver, ManagedTransaction
+from neo4j.exceptions import DriverError, Neo4jError
+
+
+@dataclass
+class WriterStats:
+    rows: int = 0
+    transactions: int = 0
+    retries: int = 0
+    started_at: float | None = None
+    finished_at: float | None = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+class WriterPool:
+    def __init__(
+        self,
+        driver: Driver,
+        *,
+        workers: int = 4,
+        database: str | None = None,
+        max_retries: int = 5,
+        initial_backoff: float = 0.1,
+        max_backoff: float = 5.0,
+        max_pending: int | None = None,
+    ):
+        self.driver = driver
+        self.database = database
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.stats = WriterStats()
+        # one single-threaded lane per worker: writes that share a key always go
+        # to the same lane and run in order; callers key every write that
+        # touches a node by the same value, so no two lanes lock it at once
+        self._lanes = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"neo4j-writer-{i}")
+            for i in range(workers)
+        ]
+        self._pending = threading.BoundedSemaphore(max_pending or workers * 4)
+        self._futures: List[Future] = []
+        self._futures_lock = threading.Lock()
+
+    def submit(self, key: Hashable, query: str, rows: int = 1, **parameters) -> Future:
+        # blocks once max_pending writes are queued, so producers feel back-pressure
+        self._pending.acquire()
+        with self.stats._lock:
+            if self.stats.started_at is None:
+                self.stats.started_at = time.perf_counter()
+        lane = self._lanes[hash(key) % len(self._lanes)]
+        try:
+            future = lane.submit(self._write, query, rows, parameters)
+        except BaseException:
+            self._pending.release()
+            raise
+        future.add_done_callback(lambda _: self._pending.release())
+        with self._futures_lock:
+            self._futures.append(future)
+        return future
+
+    def _write(self, query: str, rows: int, parameters: dict) -> Any:
+        def work(tx: ManagedTransaction):
+            return tx.run(query, parameters).consume()
+
+        backoff = self.initial_backoff
+        for attempt in range(self.max_retries + 1):
+            try:
+                # execute_write already retries transient errors such as deadlocks
+                # for a while; this loop covers what is left after it gives up
+                with self.driver.session(database=self.database) as session:
+                    summary = session.execute_write(work)
+                break
+            except (Neo4jError, DriverError) as error:
+                if attempt == self.max_retries or not error.is_retryable():
+                    raise
+                with self.stats._lock:
+                    self.stats.retries += 1
+                time.sleep(backoff * (1 + random.random()))
+                backoff = min(backoff * 2, self.max_backoff)
+
+        with self.stats._lock:
+            self.stats.rows += rows
+            self.stats.transactions += 1
+            self.stats.finished_at = time.perf_counter()
+        return summary
+
+    def wait(self):
+        with self._futures_lock:
+            futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def close(self):
+        try:
+            self.wait()
+        finally:
+            for lane in self._lanes:
+                lane.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()